@@ -0,0 +1,394 @@
+import json
+import logging
+import math
+import os
+from collections import deque
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from tenors import SPREADS
+
+logger = logging.getLogger(__name__)
+
+# Derived cross-asset fields alert rules can watch, e.g. "us_2s10s_spread"
+SPREAD_FIELDS = {f"us_{name}_spread": legs for name, legs in SPREADS.items()}
+
+def add_spread_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Add yield spreads (in percentage points) where both legs are present"""
+    for field, (long_leg, short_leg) in SPREAD_FIELDS.items():
+        if data.get(long_leg) is not None and data.get(short_leg) is not None:
+            data[field] = data[long_leg] - data[short_leg]
+    return data
+
+def _day(now: float) -> str:
+    return datetime.fromtimestamp(now, timezone.utc).date().isoformat()
+
+class RollingWindow:
+    """Ring buffer of the last size values with O(1) mean, standard deviation, max and min.
+
+    Sums are updated as values enter and leave the buffer; max and min come
+    from monotonic queues, so every push is amortized O(1).
+    """
+
+    def __init__(self, size: int, values: Iterable[float] = ()):
+        self.size = size
+        self._values = [0.0] * size
+        self._head = 0
+        self._count = 0
+        self._seq = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._max: deque = deque()  # (seq, value), values decreasing
+        self._min: deque = deque()  # (seq, value), values increasing
+        for value in values:
+            self.push(value)
+
+    @classmethod
+    def from_state(cls, state: Optional[Dict[str, Any]], size: int) -> "RollingWindow":
+        """Rebuild from persisted state, keeping the newest values if size shrank"""
+        values = (state or {}).get("values", [])
+        return cls(size, values[-size:])
+
+    def to_state(self) -> Dict[str, Any]:
+        return {"size": self.size, "values": self.values()}
+
+    def push(self, value: float):
+        if self._count == self.size:
+            old = self._values[self._head]
+            self._sum -= old
+            self._sum_sq -= old * old
+        else:
+            self._count += 1
+        self._values[self._head] = value
+        self._head = (self._head + 1) % self.size
+        self._sum += value
+        self._sum_sq += value * value
+
+        while self._max and self._max[-1][1] <= value:
+            self._max.pop()
+        self._max.append((self._seq, value))
+        while self._min and self._min[-1][1] >= value:
+            self._min.pop()
+        self._min.append((self._seq, value))
+
+        # Drop extremes that have left the window
+        expired = self._seq - self.size
+        while self._max[0][0] <= expired:
+            self._max.popleft()
+        while self._min[0][0] <= expired:
+            self._min.popleft()
+        self._seq += 1
+
+    def __len__(self) -> int:
+        return self._count
+
+    def values(self) -> List[float]:
+        """Values oldest first"""
+        if self._count < self.size:
+            return self._values[:self._count]
+        return self._values[self._head:] + self._values[:self._head]
+
+    def mean(self) -> Optional[float]:
+        return self._sum / self._count if self._count else None
+
+    def std(self) -> Optional[float]:
+        """Sample standard deviation"""
+        if self._count < 2:
+            return None
+        variance = (self._sum_sq - self._sum * self._sum / self._count) / (self._count - 1)
+        return math.sqrt(max(variance, 0.0))
+
+    def max(self) -> Optional[float]:
+        return self._max[0][1] if self._count else None
+
+    def min(self) -> Optional[float]:
+        return self._min[0][1] if self._count else None
+
+@dataclass
+class Alert:
+    rule: str
+    asset: str
+    current_value: float
+    previous_value: float
+    change: float
+    unit: str = "%"
+    detail: Optional[str] = None
+
+    @property
+    def subject(self) -> str:
+        if self.detail:
+            return f"Market Alert: {self.asset} {self.detail}"
+        return f"Market Alert: {self.asset} moved by {self.change:+.2f}{self.unit}"
+
+class Rule:
+    """Shared streaming behaviour: rule-specific checks plus a cooldown between alerts.
+
+    Subclasses are dataclasses with field and cooldown attributes and
+    implement check(). State is a per-rule dict persisted by the alert engine
+    under the rule's name: its configured id, or "<field>:<kind>" without one.
+    """
+    kind = "rule"
+    id: Optional[str] = None
+
+    @property
+    def name(self) -> str:
+        return self.id or f"{self.field}:{self.kind}"
+
+    def compare(self, current: Optional[float], previous: Optional[float]) -> Optional[Alert]:
+        """Check a single pair of observations; only meaningful for some rules"""
+        return None
+
+    def check(self, value: float, state: Dict[str, Any], now: float) -> Optional[Alert]:
+        raise NotImplementedError
+
+    def fired(self, value: float, state: Dict[str, Any]):
+        """Update state after an alert is sent"""
+
+    def evaluate(self, value: float, state: Dict[str, Any], now: float) -> Optional[Alert]:
+        """Check a new observation against the rule's persisted state, updating it in place"""
+        alert = self.check(value, state, now)
+        if alert is None or now - state.get("last_fired", 0) < self.cooldown:
+            return None
+        state["last_fired"] = now
+        self.fired(value, state)
+        return alert
+
+@dataclass
+class ThresholdRule(Rule):
+    """Fires when a field moves by at least threshold versus its reference value.
+
+    unit is "%" for percent change or "pp" for an absolute change in
+    percentage points (yields and inflation). When evaluated pairwise the
+    reference is the previous observation. When streaming, the reference is
+    the previous day's last value, reset to the fired value each time the
+    rule fires.
+    """
+    field: str
+    threshold: float
+    unit: str = "%"
+    cooldown: float = 15 * 60
+    kind = "change"
+
+    def change(self, current: float, reference: float) -> float:
+        if self.unit == "pp":
+            return current - reference
+        return ((current - reference) / reference) * 100
+
+    def compare(self, current: Optional[float], previous: Optional[float]) -> Optional[Alert]:
+        if current is None or previous is None or (self.unit == "%" and not previous):
+            return None
+        change = self.change(current, previous)
+        if abs(change) < self.threshold:
+            return None
+        return Alert(self.name, self.field, current, previous, change, self.unit)
+
+    def check(self, value: float, state: Dict[str, Any], now: float) -> Optional[Alert]:
+        day = _day(now)
+        if state.get("day") != day:
+            # New day: measure moves from yesterday's last value
+            state["day"] = day
+            state["reference"] = state.get("last_value", value)
+        state["last_value"] = value
+        return self.compare(value, state["reference"])
+
+    def fired(self, value: float, state: Dict[str, Any]):
+        state["reference"] = value
+
+class DailyWindowRule(Rule):
+    """Rule over a rolling window of completed days, built from each day's last value.
+
+    Today's observations stay separate from the window until the day rolls
+    over, so intraday moves are always judged against completed history.
+    """
+
+    def bucket_value(self, close: float, prev_close: Optional[float]) -> Optional[float]:
+        """Value pushed into the window when a day completes"""
+        raise NotImplementedError
+
+    def _window(self, state: Dict[str, Any]) -> RollingWindow:
+        window = state.get("window")
+        if not isinstance(window, RollingWindow):
+            window = RollingWindow.from_state(window, self.window_days)
+            state["window"] = window
+        return window
+
+    def _close_day(self, window: RollingWindow, state: Dict[str, Any], close: float):
+        bucket = self.bucket_value(close, state.get("prev_close"))
+        if bucket is not None:
+            window.push(bucket)
+        state["prev_close"] = close
+
+    def observe(self, value: float, state: Dict[str, Any], now: float) -> RollingWindow:
+        window = self._window(state)
+        day = _day(now)
+        if state.get("day") != day:
+            if state.get("close") is not None:
+                self._close_day(window, state, state["close"])
+            state["day"] = day
+        state["close"] = value
+        return window
+
+    def seed(self, state: Dict[str, Any], closes: Sequence[float]) -> bool:
+        """Fill an empty window from completed daily closes, oldest first"""
+        window = self._window(state)
+        if len(window) or state.get("day"):
+            return False
+        for close in closes:
+            self._close_day(window, state, close)
+        return True
+
+    def fired(self, value: float, state: Dict[str, Any]):
+        state["fired_day"] = state["day"]  # At most one alert per day
+
+@dataclass
+class ZScoreRule(DailyWindowRule):
+    """Fires when today's move is at least sigmas standard deviations of recent daily moves"""
+    field: str
+    sigmas: float = 3.0
+    window_days: int = 30
+    min_periods: int = 20
+    cooldown: float = 60 * 60
+    kind = "zscore"
+
+    def bucket_value(self, close: float, prev_close: Optional[float]) -> Optional[float]:
+        return (close / prev_close - 1) * 100 if prev_close else None
+
+    def check(self, value: float, state: Dict[str, Any], now: float) -> Optional[Alert]:
+        window = self.observe(value, state, now)
+        reference = state.get("prev_close")
+        if not reference or len(window) < self.min_periods or state.get("fired_day") == state["day"]:
+            return None
+        std = window.std()
+        if not std:
+            return None
+        move = (value / reference - 1) * 100
+        z = move / std
+        if abs(z) < self.sigmas:
+            return None
+        return Alert(self.name, self.field, value, reference, z, "σ",
+                     f"moved {move:+.2f}% ({z:+.1f}σ of {self.window_days}-day volatility)")
+
+@dataclass
+class RollingHighRule(DailyWindowRule):
+    """Fires when a field exceeds the highest (or, with low, falls below the lowest) close in the window"""
+    field: str
+    window_days: int = 365
+    low: bool = False
+    min_periods: int = 250
+    cooldown: float = 60 * 60
+
+    @property
+    def kind(self) -> str:
+        return f"{'low' if self.low else 'high'}{self.window_days}d"
+
+    def bucket_value(self, close: float, prev_close: Optional[float]) -> Optional[float]:
+        return close
+
+    def check(self, value: float, state: Dict[str, Any], now: float) -> Optional[Alert]:
+        window = self.observe(value, state, now)
+        if len(window) < self.min_periods or state.get("fired_day") == state["day"]:
+            return None
+        extreme = window.min() if self.low else window.max()
+        if (value >= extreme) if self.low else (value <= extreme):
+            return None
+        label = f"{self.window_days}-day {'low' if self.low else 'high'}"
+        return Alert(self.name, self.field, value, extreme, (value / extreme - 1) * 100, "%",
+                     f"at a {label} of {value:,.2f}")
+
+@dataclass
+class CrossRule(Rule):
+    """Fires when a field crosses level, e.g. the 2s10s spread turning negative"""
+    field: str
+    level: float = 0.0
+    unit: str = "pp"
+    cooldown: float = 60 * 60
+    kind = "cross"
+
+    def check(self, value: float, state: Dict[str, Any], now: float) -> Optional[Alert]:
+        previous_side = state.get("side")
+        previous_value = state.get("last_value")
+        side = previous_side if value == self.level else (1 if value > self.level else -1)
+        state["side"] = side
+        state["last_value"] = value
+        if previous_side is None or side == previous_side:
+            return None
+        direction = "above" if side > 0 else "below"
+        return Alert(self.name, self.field, value, previous_value, value - previous_value, self.unit,
+                     f"crossed {direction} {self.level:g}{self.unit} (now {value:+.2f}{self.unit})")
+
+RULE_TYPES = {
+    "change": ThresholdRule,
+    "zscore": ZScoreRule,
+    "high": RollingHighRule,
+    "cross": CrossRule
+}
+
+DEFAULT_RULES = [
+    {"type": "change", "field": "gold_usd", "threshold": 1.0},
+    {"type": "change", "field": "bitcoin", "threshold": 2.0},
+    {"type": "change", "field": "sp500", "threshold": 1.0},
+    {"type": "change", "field": "gbp_usd", "threshold": 0.5},
+    {"type": "change", "field": "us_10y_yield", "threshold": 0.1, "unit": "pp"},
+    {"type": "change", "field": "uk_inflation", "threshold": 0.2, "unit": "pp"},
+    {"type": "change", "field": "us_inflation", "threshold": 0.2, "unit": "pp"},
+    {"type": "zscore", "field": "bitcoin", "sigmas": 3.0, "window_days": 30},
+    {"type": "cross", "field": "us_2s10s_spread", "level": 0.0},
+    {"type": "high", "field": "gold_gbp", "window_days": 365}
+]
+
+class RuleSet:
+    """Alert rules indexed by the fields they watch"""
+
+    def __init__(self, rules: Iterable[Rule]):
+        self.rules: List[Rule] = list(rules)
+        self.by_field: Dict[str, List[Rule]] = {}
+        names = set()
+        for rule in self.rules:
+            # Rules with the same name would share cooldowns, references and rolling windows
+            if rule.name in names:
+                raise ValueError(f"Duplicate alert rule name {rule.name!r}; give each rule a unique \"id\"")
+            names.add(rule.name)
+            self.by_field.setdefault(rule.field, []).append(rule)
+
+    def __iter__(self):
+        return iter(self.rules)
+
+    def fields(self) -> List[str]:
+        return list(self.by_field)
+
+    def rules_for(self, field: str) -> List[Rule]:
+        return self.by_field.get(field, [])
+
+def rules_from_config(config: List[Dict[str, Any]]) -> RuleSet:
+    """Build rules from declarative entries such as {"type": "zscore", "field": "bitcoin", "sigmas": 3}.
+
+    An optional "id" names the rule; two rules of one type on the same
+    field need distinct ids, e.g. "bitcoin-2sigma" and "bitcoin-3sigma".
+    """
+    rules = []
+    for entry in config:
+        options = dict(entry)
+        rule_type = options.pop("type", "change")
+        rule_id = options.pop("id", None)
+        if rule_type not in RULE_TYPES:
+            raise ValueError(f"Unknown alert rule type: {rule_type}")
+        rule = RULE_TYPES[rule_type](**options)
+        rule.id = rule_id
+        rules.append(rule)
+    return RuleSet(rules)
+
+def default_rules() -> RuleSet:
+    return rules_from_config(DEFAULT_RULES)
+
+def load_rules(path: Optional[str] = None) -> RuleSet:
+    """Rules from a JSON config file (ALERT_RULES_PATH by default), falling back to the defaults"""
+    path = path or os.getenv('ALERT_RULES_PATH')
+    if not path:
+        return default_rules()
+    try:
+        with open(path) as f:
+            return rules_from_config(json.load(f))
+    except Exception as e:
+        logger.error(f"Could not load alert rules from {path}, using defaults: {str(e)}")
+        return default_rules()
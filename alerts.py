@@ -0,0 +1,135 @@
+import json
+import logging
+import os
+import time
+import traceback
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+
+from alert_rules import Alert, DailyWindowRule, RollingWindow, SPREAD_FIELDS, add_spread_fields
+from notification_manager import NotificationManager
+
+logger = logging.getLogger(__name__)
+
+def _encode_state(value: Any) -> Any:
+    if isinstance(value, RollingWindow):
+        return value.to_state()
+    raise TypeError(f"Cannot serialise {type(value).__name__}")
+
+class AlertEngine:
+    """Evaluates alert rules against each new snapshot as it arrives.
+
+    Only rules watching fields whose value changed since the previous
+    snapshot are evaluated. Yield spreads are derived before evaluation so
+    rules can watch them like any other field. Rule state (reference
+    values, rolling windows, last fired time) and the daily summary date
+    persist to state_path, so restarts neither re-fire alerts nor resend
+    the summary.
+    """
+
+    def __init__(self, notification_manager: Optional[NotificationManager] = None,
+                 state_path: str = ".alert_state.json"):
+        self.notification_manager = notification_manager or NotificationManager()
+        self.rules = self.notification_manager.rules
+        self.state_path = state_path
+        self.last_values: Dict[str, float] = {}
+        self.rule_state: Dict[str, Dict[str, Any]] = {}
+        self._lock = Lock()
+        self._load_state()
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path) as f:
+                state = json.load(f)
+            self.last_values = state.get("last_values", {})
+            self.rule_state = state.get("rules", {})
+            if state.get("last_summary_date"):
+                self.notification_manager.last_summary_date = datetime.fromisoformat(state["last_summary_date"])
+        except Exception as e:
+            logger.error(f"Could not read alert state: {str(e)}")
+
+    def _save_state(self):
+        last_summary = self.notification_manager.last_summary_date
+        state = {
+            "last_values": self.last_values,
+            "rules": self.rule_state,
+            "last_summary_date": last_summary.isoformat() if last_summary else None
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f, default=_encode_state)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.error(f"Could not save alert state: {str(e)}")
+
+    def changed_fields(self, snapshot: Dict[str, Any]) -> List[str]:
+        """Watched fields whose value differs from the last snapshot"""
+        return [
+            field for field in self.rules.fields()
+            if snapshot.get(field) is not None and snapshot[field] != self.last_values.get(field)
+        ]
+
+    def evaluate(self, snapshot: Dict[str, Any], now: Optional[float] = None) -> List[Alert]:
+        """Update rule state for changed fields and return the alerts that fired"""
+        now = now if now is not None else time.time()
+        snapshot = add_spread_fields(dict(snapshot))
+        alerts = []
+        for field in self.changed_fields(snapshot):
+            value = snapshot[field]
+            self.last_values[field] = value
+            for rule in self.rules.rules_for(field):
+                alert = rule.evaluate(value, self.rule_state.setdefault(rule.name, {}), now)
+                if alert:
+                    alerts.append(alert)
+        return alerts
+
+    def history_fields(self) -> List[str]:
+        """Stored fields needed to seed the rolling-window rules"""
+        fields = set()
+        for rule in self.rules:
+            if isinstance(rule, DailyWindowRule):
+                fields.update(SPREAD_FIELDS.get(rule.field, (rule.field,)))
+        return sorted(fields)
+
+    def warm_up(self, history: Optional[pd.DataFrame]):
+        """Seed empty rolling windows from daily history with <field>_close columns"""
+        if history is None or history.empty:
+            return
+        # Today's bucket is still partial
+        today = pd.Timestamp.now(tz="UTC").normalize()
+        history = history[history.index < today]
+        for rule in self.rules:
+            if not isinstance(rule, DailyWindowRule):
+                continue
+            legs = SPREAD_FIELDS.get(rule.field)
+            try:
+                if legs:
+                    closes = history[f"{legs[0]}_close"] - history[f"{legs[1]}_close"]
+                else:
+                    closes = history[f"{rule.field}_close"]
+            except KeyError:
+                continue
+            closes = closes.dropna().tolist()
+            if rule.seed(self.rule_state.setdefault(rule.name, {}), closes):
+                logger.info(f"Seeded {rule.name} with {len(closes)} daily closes")
+
+    def process(self, snapshot: Dict[str, Any]):
+        """Evaluate a new snapshot, send any alerts and the daily summary, and persist state"""
+        with self._lock:
+            try:
+                alerts = self.evaluate(snapshot)
+                if alerts:
+                    logger.info(f"{len(alerts)} alert(s) fired: {[alert.rule for alert in alerts]}")
+                    self.notification_manager.send_alerts(alerts)
+                self.notification_manager.send_daily_summary(snapshot)
+            except Exception as e:
+                logger.error(f"Error processing snapshot for alerts: {str(e)}")
+                logger.error(f"Full error details: {traceback.format_exc()}")
+            finally:
+                self._save_state()
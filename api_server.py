@@ -0,0 +1,298 @@
+import gzip
+import hashlib
+import json
+import logging
+import math
+import os
+import queue
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from threading import Lock, Thread
+from typing import Any, Dict, Optional
+
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
+
+from broadcast import Broadcaster, changed_entries, sse_message
+from cache import default_cache
+from market_data import MarketDataFetcher, add_derived_fields
+from metrics import PhaseTimer, get_metrics
+from snapshot import Snapshot, SnapshotProvider
+from timeseries import read_latest
+from utils import format_percentage
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler('api_server.log')
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Seconds between background snapshot refreshes
+SNAPSHOT_REFRESH_SECONDS = 60
+
+# The collector's state file; its latest snapshot is used while it is fresh
+COLLECTOR_STATE_PATH = os.getenv('COLLECTOR_STATE_PATH', '.collector_state.json')
+COLLECTOR_FRESH_SECONDS = 15 * 60
+COLLECTOR_WATCH_SECONDS = 0.5
+
+# Seconds between keep-alive comments on idle event streams
+STREAM_HEARTBEAT_SECONDS = 15
+
+# Payload sections in the shape templates/index.html renders: key -> (field, prefix, suffix, decimals)
+METRICS = {
+    "gold_usd": ("gold_usd", "$", "", 2),
+    "gold_gbp": ("gold_gbp", "£", "", 2),
+    "gbp_usd": ("gbp_usd", "", "", 4),
+    "sp500": ("sp500", "", "", 2),
+    "bitcoin": ("bitcoin", "$", "", 2)
+}
+RATES = {
+    "uk": {
+        "base_rate": ("uk_base_rate", "", "%", 2),
+        "inflation": ("uk_inflation", "", "%", 2)
+    },
+    "us": {
+        "base_rate": ("us_base_rate", "", "%", 2),
+        "inflation": ("us_inflation", "", "%", 2)
+    }
+}
+YIELDS = {
+    "2Y": ("us_2y_yield", "", "%", 3),
+    "5Y": ("us_5y_yield", "", "%", 3),
+    "10Y": ("us_10y_yield", "", "%", 3),
+    "30Y": ("us_30y_yield", "", "%", 3)
+}
+
+app = Flask(__name__)
+
+@dataclass
+class EncodedPayload:
+    """A payload serialised once per change and shared by every request"""
+    payload: Dict[str, Any]
+    body: bytes
+    gzipped: bytes
+    etag: str
+    last_modified: datetime
+
+def get_previous_data() -> Optional[Dict[str, Any]]:
+    """Second most recent stored row, from the database or else the local store"""
+    try:
+        try:
+            results = read_latest(2)
+        except Exception as e:
+            logger.error(f"Error reading latest rows from database: {str(e)}")
+            results = None
+        if results is None:
+            # pyarrow is only loaded when the database is unavailable
+            from columnar_store import get_store
+            results = get_store().read_latest(2)
+        if len(results) < 2:
+            return None
+        previous_row = results.iloc[1]
+        return previous_row.where(previous_row.notna(), None).to_dict()
+    except Exception as e:
+        logger.error(f"Error fetching previous data: {str(e)}")
+        return None
+
+def format_entry(current: Dict[str, Any], previous: Optional[Dict[str, Any]], spec) -> Dict[str, str]:
+    """Formatted value, percent change and change direction for one field"""
+    field, prefix, suffix, decimals = spec
+    value = current.get(field)
+    previous_value = (previous or {}).get(field)
+
+    change = 0.0
+    if value is not None and previous_value:
+        change = ((value - previous_value) / previous_value) * 100
+
+    return {
+        "value": f"{prefix}{value:,.{decimals}f}{suffix}" if value is not None and not math.isnan(value) else "N/A",
+        "change": format_percentage(change),
+        "direction": "normal" if change > 0 else "inverse" if change < 0 else "neutral"
+    }
+
+def build_payload(current: Dict[str, Any], previous: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """The /api/market-data document, without its timestamp"""
+    return {
+        "metrics": {key: format_entry(current, previous, spec) for key, spec in METRICS.items()},
+        "rates": {
+            country: {rate: format_entry(current, previous, spec) for rate, spec in rates.items()}
+            for country, rates in RATES.items()
+        },
+        "yields": {term: format_entry(current, previous, spec) for term, spec in YIELDS.items()}
+    }
+
+class PayloadEncoder:
+    """Encodes payloads, keeping the previous encoding (and its ETag and time) while content is unchanged"""
+
+    def __init__(self):
+        self._current: Optional[EncodedPayload] = None
+        self._lock = Lock()
+
+    def encode(self, payload: Dict[str, Any]) -> EncodedPayload:
+        content = json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()
+        etag = hashlib.sha1(content).hexdigest()
+        with self._lock:
+            if self._current is not None and self._current.etag == etag:
+                return self._current
+
+            modified = datetime.now(timezone.utc).replace(microsecond=0)
+            document = dict(payload, timestamp=modified.strftime('%Y-%m-%d %H:%M:%S UTC'))
+            body = json.dumps(document, separators=(",", ":")).encode()
+            self._current = EncodedPayload(document, body, gzip.compress(body, compresslevel=6), etag, modified)
+            return self._current
+
+def read_collector_snapshot() -> Optional[Dict[str, Any]]:
+    """The collector service's latest snapshot, if its state file was updated recently.
+
+    Values past their expiry are None, as in the rows the collector stores.
+    """
+    try:
+        if time.time() - os.path.getmtime(COLLECTOR_STATE_PATH) > COLLECTOR_FRESH_SECONDS:
+            return None
+        with open(COLLECTOR_STATE_PATH) as f:
+            state = json.load(f)
+        latest, expires_at = state.get("latest"), state.get("expires_at", {})
+        if not latest:
+            return None
+        now = time.time()
+        snapshot = {field: value if expires_at.get(field, 0) > now else None for field, value in latest.items()}
+        return add_derived_fields(snapshot)
+    except Exception:
+        return None
+
+def load_encoded_payload(market_fetcher: MarketDataFetcher, encoder: PayloadEncoder) -> EncodedPayload:
+    """Encode the API payload from the collector's snapshot, fetching directly when it isn't running"""
+    phases = PhaseTimer("api_payload")
+    current_data = read_collector_snapshot()
+    if current_data is None:
+        current_data, _ = market_fetcher.get_market_data_concurrent()
+    phases.mark("current")
+    previous_data = get_previous_data()
+    phases.mark("previous")
+    payload = build_payload(current_data, previous_data)
+    phases.mark("build")
+    encoded = encoder.encode(payload)
+    phases.mark("encode")
+    return encoded
+
+class ChangePublisher:
+    """Snapshot listener that broadcasts only the payload entries that changed"""
+
+    def __init__(self, broadcaster: Broadcaster):
+        self.broadcaster = broadcaster
+        self.last: Optional[EncodedPayload] = None
+        self.event_id = 0
+
+    def __call__(self, snapshot: Snapshot):
+        encoded = snapshot.data
+        if encoded is self.last:
+            return
+        changes = changed_entries(self.last.payload if self.last else None, encoded.payload)
+        self.last = encoded
+        self.event_id += 1
+        self.broadcaster.publish(sse_message("update", changes, self.event_id))
+
+def watch_collector_state(provider: SnapshotProvider):
+    """Refresh as soon as the collector writes a new snapshot"""
+    last_mtime = None
+    while True:
+        try:
+            mtime = os.path.getmtime(COLLECTOR_STATE_PATH)
+        except OSError:
+            mtime = None
+        if mtime is not None and last_mtime is not None and mtime != last_mtime:
+            try:
+                provider.refresh()
+            except Exception as e:
+                logger.error(f"Refresh after collector update failed: {str(e)}")
+        last_mtime = mtime
+        time.sleep(COLLECTOR_WATCH_SECONDS)
+
+broadcaster = Broadcaster()
+publisher = ChangePublisher(broadcaster)
+
+_provider: Optional[SnapshotProvider] = None
+_provider_lock = Lock()
+
+def get_provider() -> SnapshotProvider:
+    """Start one background refresher shared by every request in this process"""
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            market_fetcher = MarketDataFetcher(cache=default_cache())
+            encoder = PayloadEncoder()
+            _provider = SnapshotProvider(lambda: load_encoded_payload(market_fetcher, encoder),
+                                         refresh_interval=SNAPSHOT_REFRESH_SECONDS)
+            _provider.listeners.append(publisher)
+            _provider.start()
+            Thread(target=watch_collector_state, args=(_provider,), name="collector-watcher", daemon=True).start()
+        return _provider
+
+@app.route("/")
+def index():
+    return render_template("index.html")
+
+@app.route("/api/market-data")
+def market_data():
+    """Latest payload; unchanged polls get 304 via ETag or Last-Modified"""
+    try:
+        snapshot = get_provider().get(wait=True, timeout=30)
+    except Exception as e:
+        logger.error(f"Error getting market snapshot: {str(e)}")
+        logger.error(traceback.format_exc())
+        snapshot = None
+    if snapshot is None:
+        return jsonify({"error": "Market data unavailable"}), 503
+
+    encoded = snapshot.data
+    if "gzip" in request.accept_encodings:
+        response = Response(encoded.gzipped, mimetype="application/json")
+        response.headers["Content-Encoding"] = "gzip"
+        response.set_etag(f"{encoded.etag}-gzip")
+    else:
+        response = Response(encoded.body, mimetype="application/json")
+        response.set_etag(encoded.etag)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    response.last_modified = encoded.last_modified
+    return response.make_conditional(request)
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus text exposition of this process's metrics"""
+    return Response(get_metrics().render(), mimetype="text/plain; version=0.0.4")
+
+@app.route("/api/stream")
+def stream():
+    """Server-sent events: the full payload on connect, then only changed entries"""
+    # Subscribe first so no update between the snapshot and the stream is lost
+    subscriber = broadcaster.subscribe()
+    snapshot = get_provider().get(wait=True, timeout=30)
+
+    def events():
+        try:
+            if snapshot is not None:
+                yield sse_message("snapshot", snapshot.data.payload, publisher.event_id)
+            while not subscriber.dropped:
+                try:
+                    yield subscriber.queue.get(timeout=STREAM_HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    yield b": keep-alive\n\n"
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    response = Response(stream_with_context(events()), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-cache"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+if __name__ == "__main__":
+    get_provider()
+    app.run(host="0.0.0.0", port=int(os.getenv("PORT", 8000)), threaded=True)
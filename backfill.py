@@ -0,0 +1,219 @@
+import argparse
+import logging
+import sys
+import time
+import traceback
+from datetime import date, datetime, timedelta
+from typing import Optional
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from db import get_pool, FINANCIAL_DATA_COLUMNS
+from market_data import MarketDataFetcher, PRICE_SYMBOLS, YIELD_CURVE_SYMBOLS
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler('backfill.log')
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Rows whose timestamp already exists are skipped, so reruns only insert the gaps.
+# ON CONFLICT covers rows another writer commits meanwhile, via the unique timestamp index.
+# Casts give the VALUES list column types even when a whole column is NULL.
+BACKFILL_SQL = f"""
+    INSERT INTO financial_data ({', '.join(FINANCIAL_DATA_COLUMNS)})
+    SELECT * FROM (VALUES %s) AS v ({', '.join(FINANCIAL_DATA_COLUMNS)})
+    WHERE NOT EXISTS (
+        SELECT 1 FROM financial_data f WHERE f.timestamp = v.timestamp
+    )
+    ON CONFLICT DO NOTHING
+"""
+
+# Built once with --create-index; backfills refuse to run without it
+TIMESTAMP_INDEX = "financial_data_timestamp_key"
+# Any valid, non-partial unique index on timestamp alone (including a primary key)
+UNIQUE_TIMESTAMP_INDEX_SQL = """
+    SELECT 1 FROM pg_index i
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = i.indkey[0]
+    WHERE i.indrelid = 'financial_data'::regclass
+      AND i.indisunique AND i.indisvalid AND i.indpred IS NULL
+      AND i.indnatts = 1 AND a.attname = 'timestamp'
+"""
+DUPLICATE_TIMESTAMPS_SQL = """
+    SELECT timestamp, COUNT(*) FROM financial_data
+    GROUP BY timestamp HAVING COUNT(*) > 1
+    ORDER BY timestamp LIMIT %s
+"""
+BACKFILL_TEMPLATE = "(%s::timestamptz, " + ", ".join(["%s::numeric"] * (len(FINANCIAL_DATA_COLUMNS) - 1)) + ")"
+
+def daily_timestamps(start: date, end: date) -> pd.DatetimeIndex:
+    """One UTC midnight timestamp per calendar day in the range"""
+    return pd.date_range(start, end, freq="D", tz="UTC")
+
+def get_existing_timestamps(pool, start: date, end: date) -> pd.DatetimeIndex:
+    """Timestamps already stored in financial_data within the range"""
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT timestamp FROM financial_data
+                WHERE timestamp >= %s AND timestamp < %s
+            """, (start, end + timedelta(days=1)))
+            rows = cur.fetchall()
+    return pd.DatetimeIndex(pd.to_datetime([row[0] for row in rows], utc=True))
+
+def build_history_frame(market_fetcher: MarketDataFetcher, start: date, end: date) -> pd.DataFrame:
+    """Download every source once for the range and align them on a daily index"""
+    days = pd.date_range(start, end, freq="D")
+
+    # Yahoo: one bulk download for all prices and yields
+    symbols = {**PRICE_SYMBOLS, **YIELD_CURVE_SYMBOLS}
+    logger.info(f"Downloading Yahoo history for {len(symbols)} symbols")
+    closes = market_fetcher.get_quote_history(list(symbols.values()), start, end)
+    yahoo = closes.rename(columns={symbol: field for field, symbol in symbols.items()})
+    yahoo = yahoo.reindex(columns=list(symbols))
+
+    # FRED: monthly rates and the daily 2-year yield, carried forward until the next observation
+    logger.info("Downloading FRED FEDFUNDS, CPIAUCSL and DGS2 history")
+    us_rates = market_fetcher.get_us_rates_history(start, end)
+    us_2y_yield = market_fetcher.get_us_2y_yield_history(start, end).to_frame()
+
+    # Bank of England: the full table of rate changes, carried forward between changes
+    logger.info("Downloading Bank of England Bank Rate history")
+    uk_base_rate = market_fetcher.get_uk_base_rate_history().to_frame()
+
+    # Align on calendar days; markets that are closed keep their last close
+    lookback = days.union(yahoo.index).union(us_rates.index).union(us_2y_yield.index).union(uk_base_rate.index)
+    frame = pd.concat([yahoo, us_rates, us_2y_yield, uk_base_rate], axis=1).reindex(lookback).sort_index().ffill()
+    frame = frame.reindex(days)
+
+    frame["gold_gbp"] = frame["gold_usd"] / frame["gbp_usd"]
+    # ONS does not publish a machine-readable CPI history on the page we scrape
+    frame["uk_inflation"] = float("nan")
+    frame.index = frame.index.tz_localize("UTC")
+    frame.index.name = "timestamp"
+    return frame
+
+def has_unique_timestamp_index(pool) -> bool:
+    """Whether financial_data has a valid unique index on timestamp"""
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(UNIQUE_TIMESTAMP_INDEX_SQL)
+            return cur.fetchone() is not None
+
+def create_timestamp_index(pool, report_limit: int = 20) -> bool:
+    """Add the unique timestamp index without blocking writers, unless duplicates already exist"""
+    try:
+        if has_unique_timestamp_index(pool):
+            logger.info("financial_data already has a unique index on timestamp")
+            return True
+
+        with pool.connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute(DUPLICATE_TIMESTAMPS_SQL, (report_limit,))
+                duplicates = cur.fetchall()
+        if duplicates:
+            for timestamp, count in duplicates:
+                logger.error(f"Duplicate timestamp {timestamp}: {count} rows")
+            logger.error(f"Remove the duplicate rows above (showing at most {report_limit}) before creating the index")
+            return False
+
+        with pool.connection() as conn:
+            # CONCURRENTLY can't run inside a transaction block
+            conn.autocommit = True
+            try:
+                with conn.cursor() as cur:
+                    # A failed concurrent build leaves an invalid index behind under the same name
+                    cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {TIMESTAMP_INDEX}")
+                    cur.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {TIMESTAMP_INDEX} ON financial_data (timestamp)")
+            finally:
+                conn.autocommit = False
+        logger.info(f"Created unique index {TIMESTAMP_INDEX} on financial_data (timestamp)")
+        return True
+    except Exception as e:
+        logger.error(f"Error creating the unique timestamp index: {str(e)}")
+        return False
+
+def load_history(pool, frame: pd.DataFrame, page_size: int = 1000) -> int:
+    """Bulk insert aligned rows, skipping timestamps already present; returns rows sent"""
+    values = frame.reindex(columns=FINANCIAL_DATA_COLUMNS[1:]).astype(object)
+    values = values.where(values.notna(), None)
+    rows = list(zip(frame.index.to_pydatetime(), *(values[column] for column in values.columns)))
+    if not rows:
+        return 0
+
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            execute_values(cur, BACKFILL_SQL, rows, template=BACKFILL_TEMPLATE, page_size=page_size)
+    return len(rows)
+
+def backfill(start: date, end: date, market_fetcher: Optional[MarketDataFetcher] = None) -> bool:
+    """Backfill financial_data with one row per day between start and end"""
+    try:
+        started = time.monotonic()
+        pool = get_pool()
+        if not pool:
+            logger.error("Failed to initialize database connection")
+            return False
+
+        # Without the index, concurrent writers could store the same day twice
+        if not has_unique_timestamp_index(pool):
+            logger.error("financial_data has no unique index on timestamp; "
+                         "run `python backfill.py --create-index` first")
+            return False
+
+        # Skip the downloads entirely when every day is already stored
+        wanted = daily_timestamps(start, end)
+        missing = wanted.difference(get_existing_timestamps(pool, start, end))
+        if missing.empty:
+            logger.info(f"All {len(wanted)} days between {start} and {end} already stored")
+            return True
+
+        # Only download the span that actually has gaps
+        fetch_start, fetch_end = missing.min().date(), missing.max().date()
+        frame = build_history_frame(market_fetcher or MarketDataFetcher(), fetch_start, fetch_end)
+        frame = frame.loc[frame.index.isin(missing)]
+
+        sent = load_history(pool, frame)
+        logger.info(f"Backfilled {sent} days between {fetch_start} and {fetch_end} "
+                    f"in {time.monotonic() - started:.2f}s")
+
+        # The backfilled months are older than the local store's newest rows, so re-copy them now
+        from columnar_store import get_store
+        if get_store().sync_from_postgres() is None:
+            logger.warning("Could not sync the backfilled months into the local store; the next sync will")
+        return True
+    except Exception as e:
+        logger.error(f"Error backfilling data: {str(e)}")
+        logger.error(f"Full error details: {traceback.format_exc()}")
+        return False
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, "%Y-%m-%d").date()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill daily market history into financial_data")
+    parser.add_argument("--start", type=parse_date, help="First day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--end", type=parse_date, default=date.today(), help="Last day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--create-index", action="store_true",
+                        help="Check for duplicate timestamps, add the unique timestamp index and exit")
+    args = parser.parse_args()
+
+    if args.create_index:
+        pool = get_pool()
+        if not pool:
+            logger.error("Failed to initialize database connection")
+            sys.exit(1)
+        sys.exit(0 if create_timestamp_index(pool) else 1)
+    if args.start is None:
+        parser.error("--start is required unless --create-index is given")
+
+    logger.info(f"Starting backfill from {args.start} to {args.end}...")
+    success = backfill(args.start, args.end)
+    logger.info(f"Backfill completed. Success: {success}")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,415 @@
+import argparse
+import hashlib
+import json
+import logging
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+import requests
+
+from columnar_store import ColumnarStore
+from db import FINANCIAL_DATA_COLUMNS, ConnectionPool, store_market_data
+from fred_store import FredStore
+from history import HistoryCache, downsample_series
+from market_data import MarketDataFetcher
+from rate_limit import DEFAULT_HOST_BUDGETS, HostRateLimiter
+from scrapers import (BOE_BANK_RATE_URL, ONS_INFLATION_URL, ConditionalFetcher, UKRatesScraper,
+                      parse_boe_bank_rate, parse_ons_inflation)
+from timeseries import SERIES_FIELDS, read_latest, read_series
+from yield_curve import YieldCurveHistory
+
+# Configure logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+# Recorded pages served in place of the live sites
+REPLAY_PAGES = {
+    ONS_INFLATION_URL: "ons_inflation.html",
+    BOE_BANK_RATE_URL: "boe_bank_rate.html"
+}
+
+# Budget large enough that replayed calls never wait on the rate limiter
+UNLIMITED = (1e9, 1e9)
+
+# Synthetic history kept in the database and local store: 400 days at 15 minute intervals
+HISTORY_DAYS = 400
+HISTORY_INTERVAL = "15min"
+
+# Points per plotted history line, as dashboard.HISTORY_CHART_POINTS
+CHART_POINTS = 800
+
+def fixture_path(name: str) -> str:
+    return os.path.join(FIXTURES, name)
+
+def read_fixture(name: str) -> str:
+    with open(fixture_path(name)) as f:
+        return f.read()
+
+class ReplayResponse:
+    def __init__(self, status_code: int, text: str = "", headers: Optional[Dict[str, str]] = None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code} from replay")
+
+class ReplaySession:
+    """Serves the recorded ONS and BoE pages; with revalidate, answers a matching If-None-Match with 304 like the live sites"""
+
+    def __init__(self, revalidate: bool = True, latency: float = 0.0):
+        self.revalidate = revalidate
+        self.latency = latency
+        self.headers: Dict[str, str] = {}
+        self.calls = 0
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, **kwargs) -> ReplayResponse:
+        self.calls += 1
+        time.sleep(self.latency)
+        if url not in REPLAY_PAGES:
+            return ReplayResponse(404)
+        text = read_fixture(REPLAY_PAGES[url])
+        if not self.revalidate:
+            return ReplayResponse(200, text)
+        etag = f'"{hashlib.sha1(text.encode()).hexdigest()}"'
+        if (headers or {}).get("If-None-Match") == etag:
+            return ReplayResponse(304, headers={"ETag": etag})
+        return ReplayResponse(200, text, {"ETag": etag})
+
+class ReplayFred:
+    """fredapi.Fred stand-in answering get_series from the recorded observations"""
+
+    def __init__(self, path: str = fixture_path("fred_series.json"), latency: float = 0.0):
+        self.latency = latency
+        with open(path) as f:
+            recorded = json.load(f)
+        self.observations = {
+            series_id: pd.Series(list(values.values()), index=pd.DatetimeIndex(list(values)), name=series_id,
+                                 dtype=float)
+            for series_id, values in recorded.items()
+        }
+
+    def get_series(self, series_id: str, observation_start=None, **kwargs) -> pd.Series:
+        time.sleep(self.latency)
+        series = self.observations[series_id]
+        if observation_start is not None:
+            series = series[series.index >= pd.Timestamp(observation_start)]
+        return series.copy()
+
+def replay_download(closes: pd.DataFrame, latency: float = 0.0) -> Callable[..., pd.DataFrame]:
+    """yf.download stand-in returning the recorded closes in yfinance's column layout"""
+    def download(tickers, **kwargs) -> pd.DataFrame:
+        time.sleep(latency)
+        present = [ticker for ticker in tickers if ticker in closes.columns]
+        frame = closes[present].copy()
+        frame.columns = pd.MultiIndex.from_product([["Close"], present], names=["Price", "Ticker"])
+        return frame
+    return download
+
+def replay_conditional_fetcher(latency: float = 0.0) -> Callable[..., ConditionalFetcher]:
+    """ConditionalFetcher factory whose session serves the recorded pages"""
+    def build(*args, **kwargs) -> ConditionalFetcher:
+        fetcher = ConditionalFetcher(*args, **kwargs)
+        fetcher.session = ReplaySession(latency=latency)
+        return fetcher
+    return build
+
+@contextmanager
+def replayed_upstreams(latency: float = 0.0, rate_limits: bool = False):
+    """Serve every MarketDataFetcher built inside from fixtures, each upstream call taking latency seconds.
+
+    Per-host rate limits are lifted unless rate_limits is True.
+    """
+    closes = pd.read_csv(fixture_path("yahoo_closes.csv"), index_col="Date", parse_dates=True)
+    with ExitStack() as stack:
+        stack.enter_context(mock.patch("yfinance.download", replay_download(closes, latency)))
+        stack.enter_context(mock.patch("fredapi.Fred", lambda api_key=None: ReplayFred(latency=latency)))
+        stack.enter_context(mock.patch("scrapers.ConditionalFetcher", replay_conditional_fetcher(latency)))
+        if not rate_limits:
+            unlimited = HostRateLimiter({host: UNLIMITED for host in DEFAULT_HOST_BUDGETS}, default=UNLIMITED)
+            for module in ("market_data", "scrapers", "fred_store"):
+                stack.enter_context(mock.patch(f"{module}.get_rate_limiter", return_value=unlimited))
+        yield
+
+def replay_fetcher(workdir: str, revalidate: bool = True) -> MarketDataFetcher:
+    """A fetcher with empty caches whose ONS, BoE and FRED calls are served from fixtures"""
+    fetcher = MarketDataFetcher()
+    scrape_cache = tempfile.mkdtemp(prefix="scrape-", dir=workdir)
+    fetcher.uk_scraper = UKRatesScraper(ConditionalFetcher(cache_dir=scrape_cache))
+    fetcher.uk_scraper.fetcher.session = ReplaySession(revalidate)
+    fetcher.fred = ReplayFred()
+    fetcher.fred_store = FredStore(fetcher.fred, os.path.join(tempfile.mkdtemp(prefix="fred-", dir=workdir),
+                                                              "fred.sqlite3"))
+    return fetcher
+
+def synthetic_history(snapshot: Dict[str, Any], seed: int = 7) -> pd.DataFrame:
+    """Random walk around a snapshot, one row per HISTORY_INTERVAL over HISTORY_DAYS"""
+    end = pd.Timestamp(datetime.now(timezone.utc)).floor(HISTORY_INTERVAL)
+    index = pd.date_range(end - pd.Timedelta(days=HISTORY_DAYS), end, freq=HISTORY_INTERVAL)
+    rng = np.random.default_rng(seed)
+    frame = pd.DataFrame(index=index)
+    for field in SERIES_FIELDS:
+        level = snapshot.get(field) or 1.0
+        steps = rng.normal(0, 0.0008, len(index)).cumsum()
+        frame[field] = level * np.exp(steps - steps[-1])
+    frame.index.name = "timestamp"
+    return frame
+
+class SQLitePool:
+    """Stand-in for db.ConnectionPool over a local SQLite file, for machines without Postgres"""
+
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        columns = ", ".join(["timestamp TEXT NOT NULL"] + [f"{column} REAL" for column in FINANCIAL_DATA_COLUMNS[1:]])
+        self.conn.execute(f"CREATE TABLE IF NOT EXISTS financial_data ({columns})")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS financial_data_timestamp ON financial_data (timestamp)")
+        self.conn.commit()
+
+    @contextmanager
+    def connection(self):
+        try:
+            yield self
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+    @contextmanager
+    def cursor(self):
+        cur = self.conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+
+    def execute(self, cur, name: str, sql: str, params=None):
+        cur.execute(sql.replace("%s", "?"), params or [])
+
+    def load(self, frame: pd.DataFrame):
+        rows = frame.reset_index()
+        rows["timestamp"] = rows["timestamp"].map(lambda ts: ts.isoformat())
+        rows = rows.reindex(columns=FINANCIAL_DATA_COLUMNS)
+        self.conn.executemany(
+            f"INSERT INTO financial_data VALUES ({', '.join(['?'] * len(FINANCIAL_DATA_COLUMNS))})",
+            rows.astype(object).where(rows.notna(), None).itertuples(index=False, name=None)
+        )
+        self.conn.commit()
+
+    def read_latest(self, limit: int = 2) -> pd.DataFrame:
+        """Same shape as timeseries.read_latest"""
+        frame = pd.read_sql_query(
+            f"SELECT timestamp, {', '.join(SERIES_FIELDS)} FROM financial_data ORDER BY timestamp DESC LIMIT ?",
+            self.conn, params=(limit,)
+        )
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], utc=True, format="ISO8601")
+        return frame.set_index("timestamp")
+
+    def read_series(self, fields: List[str], start: datetime) -> pd.DataFrame:
+        """Same shape as timeseries.read_series at raw resolution"""
+        frame = pd.read_sql_query(
+            f"SELECT timestamp, {', '.join(fields)} FROM financial_data WHERE timestamp >= ? ORDER BY timestamp",
+            self.conn, params=(start.isoformat(),)
+        )
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], utc=True, format="ISO8601")
+        return frame.set_index("timestamp")
+
+def measure(fn: Callable[[Any], Any], repeat: int, setup: Callable[[], Any] = lambda: None) -> Dict[str, Any]:
+    """Time fn(setup()) repeat times, excluding setup; summary in milliseconds"""
+    seconds = []
+    for _ in range(repeat):
+        arg = setup()
+        started = time.perf_counter()
+        fn(arg)
+        seconds.append(time.perf_counter() - started)
+    ms = sorted(s * 1000 for s in seconds)
+    return {
+        "runs": len(ms),
+        "min_ms": round(ms[0], 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p95_ms": round(ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))], 3),
+        "max_ms": round(ms[-1], 3)
+    }
+
+def bench_fetch(workdir: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    # Cold: empty scrape cache and FRED store, so pages are parsed and series fully synced
+    results["fetch.get_market_data.cold"] = measure(
+        lambda fetcher: fetcher.get_market_data(), repeat, setup=lambda: replay_fetcher(workdir))
+
+    # Warm: pages answer 304 and FRED series are within their sync interval
+    warm = replay_fetcher(workdir)
+    warm.get_market_data()
+    results["fetch.get_market_data.warm"] = measure(lambda _: warm.get_market_data(), repeat)
+    results["fetch.get_market_data_concurrent.warm"] = measure(lambda _: warm.get_market_data_concurrent(), repeat)
+    return results
+
+def bench_parse(workdir: str, repeat: int) -> Dict[str, Dict[str, Any]]:
+    ons_html = read_fixture(REPLAY_PAGES[ONS_INFLATION_URL])
+    boe_html = read_fixture(REPLAY_PAGES[BOE_BANK_RATE_URL])
+    # Without validators every call downloads and re-parses both pages
+    uncached = replay_fetcher(workdir, revalidate=False)
+    return {
+        "parse.get_uk_rates": measure(lambda _: uncached.get_uk_rates(), repeat),
+        "parse.ons_inflation": measure(lambda _: parse_ons_inflation(ons_html), repeat),
+        "parse.boe_bank_rate": measure(lambda _: parse_boe_bank_rate(boe_html), repeat)
+    }
+
+def bench_db(workdir: str, repeat: int, snapshot: Dict[str, Any], history: pd.DataFrame,
+             database_url: Optional[str]) -> Dict[str, Dict[str, Any]]:
+    month_ago = (history.index[-1] - pd.Timedelta(days=30)).to_pydatetime()
+    if database_url:
+        # Writes benchmark rows to financial_data, so point this at a scratch database
+        pool = ConnectionPool(database_url, max_size=1)
+        results = {
+            "db.insert": measure(lambda _: store_market_data(pool, snapshot), repeat),
+            "db.read_latest": measure(lambda _: read_latest(2, pool=pool), repeat),
+            "db.read_series_30d": measure(lambda _: read_series(SERIES_FIELDS, month_ago, pool=pool), repeat)
+        }
+        pool.close_all()
+        return results
+
+    pool = SQLitePool(os.path.join(workdir, "financial_data.sqlite3"))
+    pool.load(history)
+    return {
+        "db.insert": measure(lambda _: store_market_data(pool, snapshot), repeat),
+        "db.read_latest": measure(lambda _: pool.read_latest(2), repeat),
+        "db.read_series_30d": measure(lambda _: pool.read_series(SERIES_FIELDS, month_ago), repeat)
+    }
+
+def bench_store(workdir: str, repeat: int, snapshot: Dict[str, Any], history: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    store = ColumnarStore(os.path.join(workdir, "market"))
+    store.append(history)
+    year_ago = (history.index[-1] - pd.Timedelta(days=366)).to_pydatetime()
+
+    def append_next(_):
+        # A fresh timestamp each run, as the collector would write
+        store.append([dict(snapshot, timestamp=datetime.now(timezone.utc).isoformat())])
+
+    return {
+        "store.append": measure(append_next, repeat),
+        "store.read_latest": measure(lambda _: store.read_latest(2), repeat),
+        "store.read_series_1y_daily": measure(lambda _: store.read_series(SERIES_FIELDS, year_ago, None, "daily"),
+                                              repeat)
+    }
+
+def bench_render(workdir: str, repeat: int, snapshot: Dict[str, Any], history: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    # Imported here so api_server's logging setup doesn't take over the benchmark's
+    from api_server import PayloadEncoder, build_payload
+
+    store = ColumnarStore(os.path.join(workdir, "render"))
+    store.append(history)
+    previous = history.iloc[-2].to_dict()
+    month = history[history.index >= history.index[-1] - pd.Timedelta(days=31)]
+    daily = store.read_series(SERIES_FIELDS, None, None, "daily")
+
+    def history_chart(cache: HistoryCache):
+        frame = cache.get_range("1Y")
+        return {field: downsample_series(frame[f"{field}_close"], CHART_POINTS) for field in SERIES_FIELDS}
+
+    def yield_curve(_):
+        curves = YieldCurveHistory.from_frame(daily)
+        return curves.spreads(), curves.inversion_periods()
+
+    return {
+        "render.build_payload": measure(lambda _: PayloadEncoder().encode(build_payload(snapshot, previous)), repeat),
+        "render.history_1y": measure(history_chart, repeat, setup=lambda: HistoryCache(reader=store.read_series)),
+        "render.downsample_1m_raw": measure(
+            lambda _: {field: downsample_series(month[field], CHART_POINTS) for field in SERIES_FIELDS}, repeat),
+        "render.yield_curve": measure(yield_curve, repeat)
+    }
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except Exception:
+        return None
+
+def run(repeat: int, groups: List[str], database_url: Optional[str]) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, Any]] = {}
+    with tempfile.TemporaryDirectory(prefix="benchmark-") as workdir, replayed_upstreams():
+        # MarketDataFetcher opens the shared FRED store; keep it out of the working tree
+        os.environ["FRED_STORE_PATH"] = os.path.join(workdir, "shared_fred.sqlite3")
+        snapshot = replay_fetcher(workdir).get_market_data()
+        history = synthetic_history(snapshot)
+
+        benches = {
+            "fetch": lambda: bench_fetch(workdir, repeat),
+            "parse": lambda: bench_parse(workdir, repeat),
+            "db": lambda: bench_db(workdir, repeat, snapshot, history, database_url),
+            "store": lambda: bench_store(workdir, repeat, snapshot, history),
+            "render": lambda: bench_render(workdir, repeat, snapshot, history)
+        }
+        for group in groups:
+            started = time.perf_counter()
+            results.update(benches[group]())
+            logger.info(f"{group} benchmarks finished in {time.perf_counter() - started:.1f}s")
+
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "database": "postgres" if database_url else "sqlite",
+        "results": results
+    }
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """Benchmarks whose median slowed by more than tolerance (a fraction) against the baseline"""
+    regressions = []
+    for name, result in report["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if not before or not before["median_ms"]:
+            continue
+        ratio = result["median_ms"] / before["median_ms"]
+        logger.info(f"{name}: {before['median_ms']:.3f}ms -> {result['median_ms']:.3f}ms ({ratio - 1:+.0%})")
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the fetch, parse, store and render paths against recorded fixtures")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed runs per benchmark")
+    parser.add_argument("--only", nargs="+", choices=["fetch", "parse", "db", "store", "render"],
+                        default=["fetch", "parse", "db", "store", "render"], help="Benchmark groups to run")
+    parser.add_argument("--database-url", help="Scratch Postgres database for the db benchmarks (default: SQLite)")
+    parser.add_argument("--output", default="benchmark_results.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Earlier JSON report to compare medians against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed median slowdown before failing")
+    args = parser.parse_args()
+
+    report = run(args.repeat, args.only, args.database_url)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    for name, result in report["results"].items():
+        logger.info(f"{name}: median {result['median_ms']:.3f}ms, p95 {result['p95_ms']:.3f}ms")
+    logger.info(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            logger.error(f"Slower than baseline by more than {args.tolerance:.0%}: {regressions}")
+            sys.exit(1)
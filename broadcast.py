@@ -0,0 +1,75 @@
+import json
+import logging
+import queue
+from threading import Lock
+from typing import Any, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+def sse_message(event: str, data: Any, event_id: Optional[int] = None) -> bytes:
+    """Encode one server-sent event"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return ("\n".join(lines) + "\n\n").encode()
+
+def changed_entries(previous: Optional[Dict[str, Any]], current: Dict[str, Any]) -> Dict[str, Any]:
+    """The parts of a nested payload that differ from previous, keeping the nesting"""
+    if previous is None:
+        return current
+    changes = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if isinstance(value, dict) and isinstance(old, dict) and "value" not in value:
+            nested = changed_entries(old, value)
+            if nested:
+                changes[key] = nested
+        elif value != old:
+            changes[key] = value
+    return changes
+
+class Subscriber:
+    def __init__(self, max_queue: int):
+        self.queue: "queue.Queue[bytes]" = queue.Queue(maxsize=max_queue)
+        self.dropped = False
+
+class Broadcaster:
+    """Fans out messages from a single producer to many subscribers.
+
+    Each message is encoded once by the producer and the same bytes are
+    queued for every subscriber. A subscriber whose queue fills up is
+    dropped rather than slowing the producer; it reconnects and starts
+    again from a full snapshot.
+    """
+
+    def __init__(self, max_queue: int = 32):
+        self.max_queue = max_queue
+        self._subscribers: Set[Subscriber] = set()
+        self._lock = Lock()
+
+    def subscribe(self) -> Subscriber:
+        subscriber = Subscriber(self.max_queue)
+        with self._lock:
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, message: bytes):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.queue.put_nowait(message)
+            except queue.Full:
+                subscriber.dropped = True
+                self.unsubscribe(subscriber)
+                logger.warning("Dropped a slow stream subscriber")
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
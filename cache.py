@@ -0,0 +1,175 @@
+import json
+import logging
+import os
+import sqlite3
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Time-to-live in seconds for each class of market data field
+FIELD_TTLS = {
+    "price": 60,             # Gold, FX, indices and crypto move every few seconds
+    "yield": 60 * 60,        # Treasury yields
+    "macro": 24 * 60 * 60    # Base rates and inflation change monthly at most
+}
+
+# Longest a result with some fields missing is cached, so the gaps are retried soon
+PARTIAL_TTL = 5 * 60
+
+class MemoryBackend:
+    """In-process cache storage with bounded size and LRU eviction"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+class DiskBackend:
+    """SQLite-backed cache storage that survives restarts.
+
+    Values must be JSON serialisable. Entries are evicted least recently
+    used first once the store grows beyond max_entries.
+    """
+
+    def __init__(self, path: str = ".market_cache.sqlite3", max_entries: int = 1024):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE cache SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+            return json.loads(row[0]), row[1]
+
+    def set(self, key: str, value: Any, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), expires_at, time.time())
+            )
+            self._conn.execute("""
+                DELETE FROM cache WHERE key IN (
+                    SELECT key FROM cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+            """, (self.max_entries,))
+            self._conn.commit()
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+class TTLCache:
+    """Cache whose entries expire according to the class of data they hold"""
+
+    def __init__(self, backend=None, ttls: Optional[Dict[str, float]] = None, partial_ttl: float = PARTIAL_TTL):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.ttls = {**FIELD_TTLS, **(ttls or {})}
+        self.partial_ttl = partial_ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = Lock()  # Fetcher threads share one cache
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for key, or None if missing or expired"""
+        try:
+            entry = self.backend.get(key)
+        except Exception as e:
+            logger.error(f"Cache read failed for {key}: {str(e)}")
+            get_metrics().inc("cache_errors_total", operation="read")
+            entry = None
+
+        if entry is None or entry[1] <= time.time():
+            with self._stats_lock:
+                self.misses += 1
+            get_metrics().inc("cache_requests_total", result="miss")
+            return None
+        with self._stats_lock:
+            self.hits += 1
+        get_metrics().inc("cache_requests_total", result="hit")
+        return entry[0]
+
+    def set(self, key: str, value: Any, field_class: str):
+        """Store value under key for the TTL of its field class, or at most partial_ttl if any field is None"""
+        ttl = self.ttls[field_class]
+        if isinstance(value, dict) and any(v is None for v in value.values()):
+            ttl = min(ttl, self.partial_ttl)
+        try:
+            self.backend.set(key, value, time.time() + ttl)
+        except Exception as e:
+            logger.error(f"Cache write failed for {key}: {str(e)}")
+            get_metrics().inc("cache_errors_total", operation="write")
+
+    def get_or_fetch(self, key: str, field_class: str,
+                     fetch: Callable[[], Dict[str, Optional[float]]]) -> Dict[str, Optional[float]]:
+        """Return cached fields for key, calling fetch only once they have expired.
+
+        Results where every field is None are treated as failed fetches and
+        are not cached, so the next call retries the upstream. Results with
+        only some fields missing are cached for at most partial_ttl.
+        """
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        value = fetch()
+        if any(v is not None for v in value.values()):
+            self.set(key, value, field_class)
+        return value
+
+def default_cache() -> TTLCache:
+    """Build the cache used by the app: on disk when MARKET_CACHE_PATH is set, else in memory"""
+    path = os.environ.get('MARKET_CACHE_PATH')
+    if path:
+        return TTLCache(DiskBackend(path))
+    return TTLCache(MemoryBackend())
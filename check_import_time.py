@@ -0,0 +1,99 @@
+import argparse
+import json
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, List
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Entry module -> (import budget in milliseconds, modules it must not load at import time)
+IMPORT_BUDGETS = {
+    "market_data": (750, ["yfinance", "fredapi", "bs4", "requests"]),
+    "notification_manager": (100, ["pandas", "numpy"]),
+    "daily_collector": (750, ["yfinance", "fredapi", "bs4"]),
+    "collector_service": (750, ["yfinance", "fredapi", "bs4"]),
+    "api_server": (800, ["yfinance", "fredapi", "bs4", "columnar_store", "pyarrow.parquet"]),
+    "dashboard": (1500, ["yfinance", "fredapi", "bs4", "columnar_store", "pyarrow.parquet"])
+}
+
+# Printed before the probe's result so module output on stdout can't be mistaken for it
+RESULT_MARKER = "IMPORT-PROBE:"
+
+PROBE = f"""
+import json, sys, time
+started = time.perf_counter()
+import {{module}}
+elapsed = time.perf_counter() - started
+print({RESULT_MARKER!r} + json.dumps({{{{"seconds": elapsed, "modules": sorted(sys.modules)}}}}))
+"""
+
+def probe(module: str, workdir: str, importtime: bool = False) -> subprocess.CompletedProcess:
+    """Import module in a fresh interpreter; log files and caches it creates land in workdir"""
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')])))
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", PROBE.format(module=module)]
+    return subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True, timeout=120)
+
+def measure(module: str, repeat: int, workdir: str) -> Dict[str, Any]:
+    """Fastest of repeat cold imports, so disk cache warm-up on the first run doesn't count against the budget"""
+    timings: List[float] = []
+    loaded: List[str] = []
+    for _ in range(repeat):
+        result = probe(module, workdir)
+        lines = [line for line in result.stdout.splitlines() if line.startswith(RESULT_MARKER)]
+        if result.returncode != 0 or not lines:
+            raise RuntimeError(f"Importing {module} failed: {result.stderr.strip().splitlines()[-1:]}")
+        report = json.loads(lines[-1][len(RESULT_MARKER):])
+        timings.append(report["seconds"] * 1000)
+        loaded = report["modules"]
+    return {"first_ms": round(timings[0], 1), "best_ms": round(min(timings), 1), "modules": loaded}
+
+def slowest_imports(module: str, workdir: str, limit: int = 10) -> List[str]:
+    """The limit imports with the largest cumulative time, from python -X importtime"""
+    rows = []
+    for line in probe(module, workdir, importtime=True).stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[1].strip().isdigit():
+            rows.append((int(parts[1]), parts[2].strip()))
+    return [f"{us / 1000:8.1f} ms  {name}" for us, name in sorted(rows, reverse=True)[:limit]]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that entry points import within their time budgets")
+    parser.add_argument("modules", nargs="*", default=list(IMPORT_BUDGETS), help="Entry modules to check")
+    parser.add_argument("--repeat", type=int, default=3, help="Imports per module; the fastest is compared")
+    parser.add_argument("--explain", action="store_true", help="List the slowest imports of modules over budget")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory(prefix="import-time-") as workdir:
+        for module in args.modules:
+            budget, deferred = IMPORT_BUDGETS.get(module, (None, []))
+            try:
+                result = measure(module, args.repeat, workdir)
+            except Exception as e:
+                logger.error(str(e))
+                failures.append(module)
+                continue
+
+            eager = [name for name in deferred if name in result["modules"]]
+            over = budget is not None and result["best_ms"] > budget
+            status = "FAIL" if over or eager else "ok"
+            logger.info(f"{status:4} {module}: {result['best_ms']:.0f} ms (first {result['first_ms']:.0f} ms, "
+                        f"budget {budget} ms)" + (f", loads {eager} eagerly" if eager else ""))
+            if status == "FAIL":
+                failures.append(module)
+                if args.explain:
+                    for line in slowest_imports(module, workdir):
+                        logger.info(f"    {line}")
+
+    sys.exit(1 if failures else 0)
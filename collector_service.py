@@ -0,0 +1,258 @@
+import argparse
+import json
+import logging
+import os
+import random
+import signal
+import sys
+import time
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from threading import Event
+from typing import Any, Callable, Dict, List, Optional
+
+from alerts import AlertEngine
+from columnar_store import get_store
+from db import get_pool, store_market_data
+from market_data import MarketDataFetcher, SourcedValues, add_derived_fields, value_sources
+from metrics import export_textfile, get_metrics, profiled
+from rate_limit import get_rate_limiter
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.StreamHandler(sys.stdout),
+        logging.FileHandler('collector_service.log')
+    ]
+)
+logger = logging.getLogger(__name__)
+
+# Seconds between runs for each field class
+DEFAULT_CADENCES = {
+    "price": 5 * 60,
+    "yield": 60 * 60,
+    "macro": 24 * 60 * 60
+}
+
+# A carried-forward value is dropped once this many of its class's intervals pass without a refresh
+STALE_AFTER_INTERVALS = 2
+
+@dataclass
+class Job:
+    name: str
+    interval: float
+    fetch: Callable[[], SourcedValues]
+    slot: float = 0.0       # Scheduled time of the next run
+    next_run: float = 0.0   # When it will actually run: the slot plus jitter, or a backoff retry
+    last_success: Optional[float] = None
+    failures: int = 0
+
+class CollectorService:
+    """Long-running collector that fetches each field class on its own cadence.
+
+    The fetcher and database pool are built once and reused for every run.
+    Each successful run merges its fields into the latest known snapshot
+    and writes a full row. Values carried forward from earlier runs are
+    written as None once they are older than STALE_AFTER_INTERVALS of
+    their class's cadence, so a long outage isn't stored as fresh
+    observations. Failed runs retry with exponential backoff and
+    jitter. Last-success times are persisted, so after a restart any class
+    whose slot was missed runs straight away (once, not once per missed slot).
+    """
+
+    def __init__(self, market_fetcher: Optional[MarketDataFetcher] = None,
+                 cadences: Optional[Dict[str, float]] = None,
+                 state_path: str = ".collector_state.json",
+                 jitter: float = 0.05, base_backoff: float = 30.0, profile_dir: Optional[str] = None):
+        self.market_fetcher = market_fetcher or MarketDataFetcher()
+        self.cadences = {**DEFAULT_CADENCES, **(cadences or {})}
+        self.state_path = state_path
+        self.jitter = jitter
+        self.base_backoff = base_backoff
+        self.profile_dir = profile_dir  # Write a cProfile dump of each job run here when set
+        self.latest: Dict[str, Any] = {}
+        self.expires_at: Dict[str, float] = {}  # When each latest value becomes too old to carry forward
+        self.sources: Dict[str, str] = {}  # Provider of each latest value
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        self._stop = Event()
+
+        fetchers = {
+            "price": self.market_fetcher.get_prices_with_sources,
+            "yield": self.market_fetcher.get_us_yield_curve_with_sources,
+            "macro": self.market_fetcher.get_macro_rates_with_sources
+        }
+        self.jobs = [Job(name, self.cadences[name], fetch) for name, fetch in fetchers.items()]
+        self._load_state()
+
+    def _load_state(self):
+        """Restore last-success times and the latest snapshot, scheduling any missed slots now"""
+        state = {}
+        if os.path.exists(self.state_path):
+            try:
+                with open(self.state_path) as f:
+                    state = json.load(f)
+            except Exception as e:
+                logger.error(f"Could not read collector state: {str(e)}")
+
+        self.latest = state.get("latest", {})
+        self.expires_at = state.get("expires_at", {})
+        self.sources = state.get("sources", {})
+        # State written before expiry times were kept can't say how old its values are
+        refetch_all = bool(self.latest) and "expires_at" not in state
+        now = time.time()
+        for job in self.jobs:
+            job.last_success = state.get("last_success", {}).get(job.name)
+            if refetch_all or job.last_success is None or now - job.last_success >= job.interval:
+                job.slot = now  # Never run, or missed while stopped: catch up once
+            else:
+                job.slot = job.last_success + job.interval
+            job.next_run = job.slot
+
+    def _save_state(self):
+        state = {
+            "last_success": {job.name: job.last_success for job in self.jobs},
+            "latest": self.latest,
+            "expires_at": self.expires_at,
+            "sources": self.sources
+        }
+        tmp_path = f"{self.state_path}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.state_path)
+        except Exception as e:
+            logger.error(f"Could not save collector state: {str(e)}")
+
+    def _jitter(self, seconds: float) -> float:
+        """Random extra delay of up to the jitter fraction of seconds"""
+        return random.uniform(0, self.jitter * seconds)
+
+    def run_job(self, job: Job) -> bool:
+        """Fetch one field class, merge it into the latest snapshot and store the row"""
+        started = time.time()
+        try:
+            values, sources = job.fetch()
+            if not any(value is not None for value in values.values()):
+                raise RuntimeError(f"No {job.name} data returned")
+        except Exception as e:
+            job.failures += 1
+            get_metrics().inc("collector_job_failures_total", job=job.name)
+            delay = min(job.interval, self.base_backoff * 2 ** (job.failures - 1))
+            job.next_run = time.time() + delay + self._jitter(delay)
+            logger.error(f"{job.name} fetch failed ({job.failures} in a row), retrying in {delay:.0f}s: {str(e)}")
+            return False
+
+        job.failures = 0
+        job.last_success = started
+        # Stay on schedule; if slots were missed, this run covered them all
+        job.slot += job.interval
+        if job.slot <= started:
+            job.slot = started + job.interval
+        job.next_run = job.slot + self._jitter(job.interval)
+
+        # Keep the last good value for fields this run couldn't fetch, until it goes stale
+        fetched = {field: value for field, value in values.items() if value is not None}
+        self.latest.update(fetched)
+        self.sources.update({field: sources[field] for field in fetched if field in sources})
+        self.expires_at.update({field: started + STALE_AFTER_INTERVALS * job.interval for field in fetched})
+        now = time.time()
+        snapshot = {field: value if self.expires_at.get(field, 0) > now else None
+                    for field, value in self.latest.items()}
+        snapshot["timestamp"] = datetime.now(timezone.utc).isoformat()
+        add_derived_fields(snapshot)
+        snapshot["sources"] = value_sources(snapshot, self.sources)
+        self.store(snapshot)
+
+        # Hand the new snapshot to listeners such as the alert engine
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                logger.error(f"Snapshot listener failed: {str(e)}")
+
+        self._save_state()
+        logger.info(f"{job.name} run stored in {time.time() - started:.2f}s")
+        waited = {host: stats["total_wait"] for host, stats in get_rate_limiter().stats().items() if stats["waits"]}
+        if waited:
+            logger.info(f"Rate limit waits so far (s): {waited}")
+        return True
+
+    def store(self, snapshot: Dict[str, Any]):
+        """Write a snapshot to the local store and, when reachable, Postgres"""
+        try:
+            get_store().append([snapshot])
+        except Exception as e:
+            logger.error(f"Failed to append to local store: {str(e)}")
+
+        pool = get_pool()
+        if not pool:
+            return
+        try:
+            store_market_data(pool, snapshot)
+        except Exception as e:
+            logger.error(f"Failed to store snapshot in database: {str(e)}")
+
+    def run(self):
+        """Run jobs as they fall due until stop() is called"""
+        logger.info(f"Collector service started with cadences {self.cadences}")
+        while not self._stop.is_set():
+            job = min(self.jobs, key=lambda j: j.next_run)
+            delay = job.next_run - time.time()
+            if delay > 0 and self._stop.wait(delay):
+                break
+            try:
+                with profiled(f"collector-{job.name}", self.profile_dir), \
+                        get_metrics().span("collector_job", job=job.name):
+                    self.run_job(job)
+            except Exception as e:
+                logger.error(f"Unexpected error running {job.name}: {str(e)}")
+                logger.error(f"Full error details: {traceback.format_exc()}")
+                job.next_run = time.time() + self.base_backoff + self._jitter(self.base_backoff)
+            export_textfile("collector")
+
+        self._save_state()
+        pool = get_pool()
+        if pool:
+            pool.close_all()
+        logger.info("Collector service stopped")
+
+    def stop(self, *_):
+        logger.info("Shutdown requested")
+        self._stop.set()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Continuously collect market data on per-class schedules")
+    parser.add_argument("--price-interval", type=float, default=DEFAULT_CADENCES["price"],
+                        help="Seconds between price and FX fetches")
+    parser.add_argument("--yield-interval", type=float, default=DEFAULT_CADENCES["yield"],
+                        help="Seconds between Treasury yield fetches")
+    parser.add_argument("--macro-interval", type=float, default=DEFAULT_CADENCES["macro"],
+                        help="Seconds between base rate and inflation fetches")
+    parser.add_argument("--no-alerts", action="store_true",
+                        help="Don't evaluate alert rules against new snapshots")
+    parser.add_argument("--profile", nargs="?", const="profiles", default=os.environ.get('PROFILE_DIR'),
+                        metavar="DIR", help="Write a cProfile dump of each job run to DIR (default: profiles)")
+    args = parser.parse_args()
+
+    service = CollectorService(cadences={
+        "price": args.price_interval,
+        "yield": args.yield_interval,
+        "macro": args.macro_interval
+    }, profile_dir=args.profile)
+    alert_engine = None if args.no_alerts else AlertEngine()
+    if alert_engine:
+        # A year of daily closes gives the rolling-window rules their history
+        history_start = datetime.now(timezone.utc) - timedelta(days=400)
+        try:
+            alert_engine.warm_up(get_store().read_series(alert_engine.history_fields(), history_start, None, "daily"))
+        except Exception as e:
+            logger.error(f"Could not seed alert rules from history: {str(e)}")
+        service.listeners.append(alert_engine.process)
+    signal.signal(signal.SIGTERM, service.stop)
+    signal.signal(signal.SIGINT, service.stop)
+    service.run()
+    if alert_engine:
+        alert_engine.notification_manager.close(timeout=30)
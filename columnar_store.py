@@ -0,0 +1,275 @@
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from db import FINANCIAL_DATA_COLUMNS
+from metrics import get_metrics
+from timeseries import read_month_summary, read_series
+
+logger = logging.getLogger(__name__)
+
+SERIES_FIELDS = FINANCIAL_DATA_COLUMNS[1:]
+
+SCHEMA = pa.schema(
+    [pa.field("timestamp", pa.timestamp("us", tz="UTC"))]
+    + [pa.field(field, pa.float64()) for field in SERIES_FIELDS]
+)
+
+# Resolution name -> pandas resample rule, bucketed like Postgres date_trunc
+RESAMPLE_RULES = {
+    "hourly": "h",
+    "daily": "D",
+    "weekly": "W-MON",
+    "monthly": "MS"
+}
+
+# Per-month row counts and latest timestamps of Postgres as of the last sync
+SYNC_STATE_FILE = "sync_state.json"
+
+def _month_bounds(month: str):
+    """First instant of month (YYYY-MM) and of the month after, in UTC"""
+    start = pd.Timestamp(f"{month}-01", tz="UTC")
+    return start, start + pd.offsets.MonthBegin(1)
+
+def _timestamp_scalar(value) -> pa.Scalar:
+    """Arrow UTC timestamp scalar for a naive (assumed UTC) or aware datetime"""
+    ts = pd.Timestamp(value)
+    ts = ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
+    return pa.scalar(ts, SCHEMA.field("timestamp").type)
+
+class ColumnarStore:
+    """Local copy of financial_data as Arrow IPC files, one per month.
+
+    Partitions are written uncompressed so reads memory-map them and
+    access columns without copying. Appends rewrite only the affected
+    month, atomically, de-duplicating on timestamp.
+    """
+
+    def __init__(self, root: str = "data/market"):
+        self.root = root
+        self._lock = Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _partition_path(self, month: str) -> str:
+        return os.path.join(self.root, f"{month}.arrow")
+
+    def partitions(self) -> List[str]:
+        """Stored months (YYYY-MM), oldest first"""
+        return sorted(name[:-len(".arrow")] for name in os.listdir(self.root) if name.endswith(".arrow"))
+
+    def _read_partition(self, month: str) -> pa.Table:
+        source = pa.memory_map(self._partition_path(month), "r")
+        return pa.ipc.open_file(source).read_all()
+
+    def _to_table(self, frame: pd.DataFrame) -> pa.Table:
+        frame = frame.reset_index() if "timestamp" not in frame.columns else frame
+        frame = frame.reindex(columns=SCHEMA.names)
+        frame["timestamp"] = pd.to_datetime(frame["timestamp"], utc=True)
+        for field in SERIES_FIELDS:
+            frame[field] = pd.to_numeric(frame[field], errors="coerce")
+        return pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+
+    def append(self, rows) -> int:
+        """Add rows (a DataFrame or list of dicts) to their month partitions; returns rows written"""
+        frame = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(list(rows))
+        if frame.empty:
+            return 0
+        table = self._to_table(frame)
+        months = pc.strftime(table["timestamp"], format="%Y-%m").to_pylist()
+
+        with self._lock, get_metrics().span("local_store", operation="append"):
+            for month in sorted(set(months)):
+                new = table.filter(pa.array([m == month for m in months]))
+                path = self._partition_path(month)
+                if os.path.exists(path):
+                    new = pa.concat_tables([self._read_partition(month), new])
+
+                # Latest write wins for a repeated timestamp
+                merged = new.to_pandas().drop_duplicates("timestamp", keep="last").sort_values("timestamp")
+                merged_table = pa.Table.from_pandas(merged, schema=SCHEMA, preserve_index=False)
+
+                tmp_path = f"{path}.tmp"
+                with pa.OSFile(tmp_path, "wb") as sink:
+                    with pa.ipc.new_file(sink, SCHEMA) as writer:
+                        writer.write_table(merged_table)
+                os.replace(tmp_path, path)
+        return table.num_rows
+
+    def read_table(self, fields: Optional[List[str]] = None,
+                   start: Optional[datetime] = None, end: Optional[datetime] = None) -> pa.Table:
+        """Memory-mapped Arrow table of the requested fields between start (inclusive) and end (exclusive)"""
+        columns = ["timestamp"] + list(fields or SERIES_FIELDS)
+        start_month = pd.Timestamp(start).strftime("%Y-%m") if start is not None else None
+        end_month = pd.Timestamp(end).strftime("%Y-%m") if end is not None else None
+
+        tables = []
+        for month in self.partitions():
+            if (start_month and month < start_month) or (end_month and month > end_month):
+                continue
+            tables.append(self._read_partition(month).select(columns))
+        if not tables:
+            return SCHEMA.empty_table().select(columns)
+
+        table = pa.concat_tables(tables)
+        if start is not None:
+            table = table.filter(pc.greater_equal(table["timestamp"], _timestamp_scalar(start)))
+        if end is not None:
+            table = table.filter(pc.less(table["timestamp"], _timestamp_scalar(end)))
+        return table
+
+    def read_series(self, fields: List[str], start: Optional[datetime] = None, end: Optional[datetime] = None,
+                    resolution: str = "raw") -> pd.DataFrame:
+        """Same shape as timeseries.read_series, served from local partitions"""
+        with get_metrics().span("local_store", operation=f"read_series_{resolution}"):
+            frame = self.read_table(fields, start, end).to_pandas().set_index("timestamp")
+        if resolution == "raw":
+            return frame
+
+        resampled = frame.resample(RESAMPLE_RULES[resolution], label="left", closed="left")
+        ohlc = {}
+        for field in fields:
+            grouped = resampled[field]
+            ohlc[f"{field}_open"] = grouped.first()
+            ohlc[f"{field}_high"] = grouped.max()
+            ohlc[f"{field}_low"] = grouped.min()
+            ohlc[f"{field}_close"] = grouped.last()
+        # Postgres only emits buckets that contain rows
+        counts = resampled.size()
+        return pd.DataFrame(ohlc)[counts > 0]
+
+    def read_latest(self, limit: int = 2) -> pd.DataFrame:
+        """Most recent stored rows, newest first"""
+        frames = []
+        needed = limit
+        for month in reversed(self.partitions()):
+            frame = self._read_partition(month).to_pandas()
+            frames.append(frame.tail(needed))
+            needed -= len(frames[-1])
+            if needed <= 0:
+                break
+        if not frames:
+            return pd.DataFrame(columns=SCHEMA.names).set_index("timestamp")
+        latest = pd.concat(frames).sort_values("timestamp", ascending=False).head(limit)
+        return latest.set_index("timestamp")
+
+    def last_timestamp(self) -> Optional[pd.Timestamp]:
+        partitions = self.partitions()
+        if not partitions:
+            return None
+        timestamps = self._read_partition(partitions[-1])["timestamp"]
+        return pd.Timestamp(pc.max(timestamps).as_py()) if len(timestamps) else None
+
+    def _read_sync_state(self) -> Dict[str, Dict[str, Any]]:
+        path = os.path.join(self.root, SYNC_STATE_FILE)
+        if not os.path.exists(path):
+            return {}
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error reading local sync state, re-syncing every month: {str(e)}")
+            return {}
+
+    def _write_sync_state(self, state: Dict[str, Dict[str, Any]]):
+        path = os.path.join(self.root, SYNC_STATE_FILE)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp_path, path)
+
+    def _sync_month(self, month: str, known: Optional[Dict[str, Any]], remote: Dict[str, Any]) -> Optional[int]:
+        """Copy a month that changed in Postgres since the last sync; returns rows copied"""
+        start, end = _month_bounds(month)
+        if known:
+            # Usually the month only grew at its end, so try the rows after the last synced one first
+            last = pd.Timestamp(known["last"])
+            tail = read_series(SERIES_FIELDS, last.to_pydatetime(), end.to_pydatetime())
+            if tail is None:
+                return None
+            tail = tail[tail.index > last]
+            if known["rows"] + len(tail) == remote["rows"]:
+                return self.append(tail)
+
+        # Rows were inserted below the high-water mark (backfill, another collector, late writes)
+        frame = read_series(SERIES_FIELDS, start.to_pydatetime(), end.to_pydatetime())
+        if frame is None:
+            return None
+        if known:
+            logger.info(f"Re-copying {month}: Postgres has rows the local store never saw")
+        return self.append(frame)
+
+    def sync_from_postgres(self, full: bool = False) -> Optional[int]:
+        """Copy rows from Postgres that the local store doesn't have yet.
+
+        Compares per-month row counts and latest timestamps in Postgres with
+        those seen at the last sync, so rows inserted into months already
+        synced (including below the newest local row) are picked up too.
+        Rows the local collectors wrote themselves are kept. Returns the
+        number of rows copied, or None if the database could not be read;
+        months that could not be copied are retried on the next sync.
+        """
+        try:
+            summary = read_month_summary()
+        except Exception as e:
+            logger.error(f"Error reading financial_data summary for local sync: {str(e)}")
+            return None
+        if summary is None:
+            return None
+
+        state = {} if full else self._read_sync_state()
+        written = 0
+        try:
+            for month in sorted(summary):
+                if state.get(month) == summary[month]:
+                    continue
+                copied = self._sync_month(month, state.get(month), summary[month])
+                if copied is None:
+                    return None
+                written += copied
+                state[month] = summary[month]
+        except Exception as e:
+            logger.error(f"Error reading financial_data for local sync: {str(e)}")
+            return None
+        finally:
+            self._write_sync_state(state)
+
+        if written:
+            logger.info(f"Synced {written} rows from Postgres into {self.root}")
+        return written
+
+_store: Optional[ColumnarStore] = None
+_store_lock = Lock()
+
+def get_store() -> ColumnarStore:
+    """Return the process-wide local store at LOCAL_STORE_PATH"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ColumnarStore(os.environ.get('LOCAL_STORE_PATH', 'data/market'))
+        return _store
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    parser = argparse.ArgumentParser(description="Manage the local columnar copy of financial_data")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subcommands.add_parser("sync", help="Copy new and changed months from Postgres into the local store")
+    sync_parser.add_argument("--full", action="store_true", help="Re-copy the whole table")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        copied = get_store().sync_from_postgres(full=args.full)
+        logger.info(f"Sync completed. Rows copied: {copied}")
+        sys.exit(0 if copied is not None else 1)
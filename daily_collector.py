@@ -1,3 +1,4 @@
+import argparse
 import os
 from datetime import datetime, timezone
 from market_data import MarketDataFetcher
@@ -5,8 +6,9 @@ from typing import Optional
 import logging
 import sys
 import traceback
-import psycopg2
-from psycopg2.extras import RealDictCursor
+from db import get_pool, store_market_data
+from columnar_store import get_store
+from metrics import export_textfile, profiled
 
 # Configure logging
 logging.basicConfig(
@@ -19,34 +21,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Initialize database connection with proper error handling"""
+def append_to_local_store(market_data):
+    """Append a snapshot to the local columnar store, which works without the database"""
     try:
-        logger.info("Attempting to connect to database...")
-        database_url = os.environ.get('DATABASE_URL')
-
-        if not database_url:
-            logger.error("Database URL not found in environment")
-            return None
-
-        conn = psycopg2.connect(database_url)
-        logger.info("Successfully connected to database")
-        return conn
+        get_store().append([market_data])
+        logger.info("Appended market data to local store")
     except Exception as e:
-        logger.error(f"Failed to connect to database: {str(e)}")
-        logger.error(f"Full error details: {traceback.format_exc()}")
-        return None
+        logger.error(f"Failed to append to local store: {str(e)}")
 
 def collect_daily_data():
     """Collect and store daily market data in database"""
-    conn = None
     try:
-        # Initialize database connection
-        conn = get_db_connection()
-        if not conn:
-            logger.error("Failed to initialize database connection")
-            return False
-
         # Initialize market data fetcher
         market_fetcher = MarketDataFetcher()
 
@@ -54,40 +39,36 @@ def collect_daily_data():
         logger.info("Fetching market data...")
         market_data = market_fetcher.get_market_data()
 
-        if market_data:
-            # Store data in database
-            logger.info(f"Attempting to store market data: {market_data}")
+        if not market_data:
+            logger.error("No market data available to store")
+            return False
 
-            cur = conn.cursor()
-            cur.execute("""
-                INSERT INTO financial_data (
-                    timestamp, gold_usd, gold_gbp, gbp_usd, sp500, bitcoin,
-                    us_2y_yield, us_5y_yield, us_10y_yield, us_30y_yield,
-                    uk_base_rate, uk_inflation, us_base_rate, us_inflation
-                ) VALUES (
-                    %(timestamp)s, %(gold_usd)s, %(gold_gbp)s, %(gbp_usd)s, 
-                    %(sp500)s, %(bitcoin)s, %(us_2y_yield)s, %(us_5y_yield)s,
-                    %(us_10y_yield)s, %(us_30y_yield)s, %(uk_base_rate)s,
-                    %(uk_inflation)s, %(us_base_rate)s, %(us_inflation)s
-                )
-            """, market_data)
+        append_to_local_store(market_data)
 
-            conn.commit()
-            cur.close()
-            logger.info("Successfully stored daily market data")
-            return True
+        pool = get_pool()
+        if not pool:
+            logger.error("Failed to initialize database connection")
+            return False
 
-        logger.error("No market data available to store")
-        return False
+        # Store data in database
+        logger.info(f"Attempting to store market data: {market_data}")
+        store_market_data(pool, market_data)
+        logger.info("Successfully stored daily market data")
+        logger.info(f"Database pool stats: {pool.stats()}")
+        return True
     except Exception as e:
         logger.error(f"Error collecting daily data: {str(e)}")
         logger.error(f"Full error details: {traceback.format_exc()}")
         return False
-    finally:
-        if conn:
-            conn.close()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch one market data snapshot and store it")
+    parser.add_argument("--profile", nargs="?", const="profiles", default=os.environ.get('PROFILE_DIR'),
+                        metavar="DIR", help="Write a cProfile dump of the run to DIR (default: profiles)")
+    args = parser.parse_args()
+
     logger.info("Starting daily data collection process...")
-    success = collect_daily_data()
-    logger.info(f"Daily data collection completed. Success: {success}")
\ No newline at end of file
+    with profiled("daily_collector", args.profile):
+        success = collect_daily_data()
+    export_textfile("daily_collector")
+    logger.info(f"Daily data collection completed. Success: {success}")
@@ -1,20 +1,19 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, timezone, timedelta
 import time
 from utils import get_delta_color, format_percentage
 from market_data import MarketDataFetcher
-import plotly.graph_objects as go
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from typing import Optional
+from cache import default_cache
+from snapshot import SnapshotProvider
+from yield_curve import YieldCurveHistory, TENORS
+from history import HistoryCache, HISTORY_RANGES, downsample_series, value_column
+from portfolio import PortfolioHistory, load_positions
+from timeseries import read_latest
+from metrics import PhaseTimer, export_textfile, get_metrics, profiled
 import os
 import logging
-import pathlib
 import sys
 import traceback
-from notification_manager import NotificationManager
-from decimal import Decimal
 
 # Configure logging
 logging.basicConfig(
@@ -27,63 +26,101 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-def get_db_connection():
-    """Get database connection with proper error handling"""
-    try:
-        logger.info("Attempting to connect to database...")
-        database_url = os.environ.get('DATABASE_URL')
-
-        if not database_url:
-            error_msg = "Database URL not found in environment"
-            logger.error(error_msg)
-            st.error("Database connection failed: Missing credentials")
-            return None
-
-        conn = psycopg2.connect(database_url)
-        logger.info("Successfully connected to database")
-        return conn
-    except Exception as e:
-        error_msg = f"Failed to connect to database: {str(e)}"
-        logger.error(error_msg)
-        logger.error(traceback.format_exc())
-        st.error(f"Database connection failed: {str(e)}")
-        return None
+# Seconds between background snapshot refreshes
+SNAPSHOT_REFRESH_SECONDS = 60
+
+# Points plotted per history line, about the pixel width of a full-width chart
+HISTORY_CHART_POINTS = 800
+
+# History chart choices -> fields plotted and their trace labels
+HISTORY_SERIES = {
+    "Gold (USD)": {"gold_usd": "Gold (USD)"},
+    "Gold (GBP)": {"gold_gbp": "Gold (GBP)"},
+    "GBP/USD": {"gbp_usd": "GBP/USD"},
+    "S&P 500": {"sp500": "S&P 500"},
+    "Bitcoin (USD)": {"bitcoin": "Bitcoin (USD)"},
+    "Treasury Yields": {
+        "us_2y_yield": "2Y",
+        "us_5y_yield": "5Y",
+        "us_10y_yield": "10Y",
+        "us_30y_yield": "30Y"
+    },
+    "Base Rates": {"uk_base_rate": "UK Bank Rate", "us_base_rate": "Federal Funds Rate"},
+    "Inflation": {"uk_inflation": "UK", "us_inflation": "US"}
+}
+
+def read_local_history(fields, start, end, resolution):
+    """Read history from the local columnar store, first syncing new rows when reading the tail"""
+    # Imported on first use so the page starts rendering before pyarrow has loaded
+    from columnar_store import get_store
+    store = get_store()
+    if end is None:
+        # Leaves the local copy as-is when Postgres is unreachable
+        store.sync_from_postgres()
+    return store.read_series(fields, start, end, resolution)
+
+@st.cache_resource
+def get_history_cache():
+    """One incrementally loaded history cache shared by every session"""
+    return HistoryCache(reader=read_local_history)
+
+@st.cache_resource
+def get_positions():
+    """Portfolio positions from PORTFOLIO_PATH, read once per process"""
+    return load_positions()
 
 def get_historical_data():
     """Fetch the last two days of data from database"""
     try:
-        conn = get_db_connection()
-        if not conn:
-            logger.error("Cannot fetch historical data: Database connection failed")
-            return None
-
-        cur = conn.cursor(cursor_factory=RealDictCursor)
-        cur.execute("""
-            SELECT * FROM financial_data 
-            ORDER BY timestamp DESC 
-            LIMIT 2;
-        """)
-        results = cur.fetchall()
-
-        if results:
+        try:
+            results = read_latest(2)
+        except Exception as e:
+            logger.error(f"Error reading latest rows from database: {str(e)}")
+            results = None
+        if results is None:
+            logger.warning("Database unavailable, reading historical data from local store")
+            from columnar_store import get_store
+            results = get_store().read_latest(2)
+
+        if not results.empty:
             logger.info(f"Successfully fetched {len(results)} records")
-            # Convert Decimal to float for numeric fields
-            for result in results:
-                for key, value in result.items():
-                    if isinstance(value, (Decimal, float)):
-                        result[key] = float(value)
-            return pd.DataFrame(results)
+            return results.reset_index()
         logger.warning("No historical data found")
         return None
     except Exception as e:
         logger.error(f"Error fetching historical data: {str(e)}")
-        st.error(f"Failed to fetch market data: {str(e)}")
+        logger.error(traceback.format_exc())
         return None
-    finally:
-        if 'cur' in locals() and cur is not None:
-            cur.close()
-        if 'conn' in locals() and conn is not None:
-            conn.close()
+
+def load_snapshot_data(market_fetcher):
+    """Fetch everything the dashboard renders; runs on the snapshot refresher thread"""
+    # Fetch all sources in parallel so one slow site can't stall the refresh
+    current_data, source_timings = market_fetcher.get_market_data_concurrent()
+
+    # Get historical data
+    hist_data = get_historical_data()
+
+    # Get previous day's data, with missing values as None rather than NaN
+    previous_data = None
+    if hist_data is not None and len(hist_data) > 1:
+        previous_row = hist_data.iloc[1]
+        previous_data = previous_row.where(previous_row.notna(), None).to_dict()
+
+    return {
+        "current": current_data,
+        "previous": previous_data,
+        "source_timings": source_timings,
+        "history_available": hist_data is not None
+    }
+
+@st.cache_resource
+def get_snapshot_provider():
+    """Start one background refresher shared by every session in this process"""
+    market_fetcher = MarketDataFetcher(cache=default_cache())
+    provider = SnapshotProvider(lambda: load_snapshot_data(market_fetcher),
+                                refresh_interval=SNAPSHOT_REFRESH_SECONDS)
+    provider.start()
+    return provider
 
 def format_value(value, prefix="", suffix="", default="N/A"):
     """Format a value with proper handling of None"""
@@ -117,17 +154,14 @@ def calculate_change(current, previous, field):
 
 def create_yield_curve_chart(data):
     """Create yield curve chart with proper None handling"""
+    import plotly.graph_objects as go
     try:
-        maturities = [2, 5, 10, 30]
-        yields = [
-            data.get('us_2y_yield', 0),
-            data.get('us_5y_yield', 0),
-            data.get('us_10y_yield', 0),
-            data.get('us_30y_yield', 0)
-        ]
-
-        # Replace None values with 0
-        yields = [0 if y is None else y for y in yields]
+        # Plot only the tenors we have; a missing yield is not a zero yield
+        points = [(maturity, data.get(field)) for field, maturity in TENORS.items()
+                  if data.get(field) is not None]
+        if not points:
+            return None
+        maturities, yields = zip(*points)
 
         fig = go.Figure()
         fig.add_trace(go.Scatter(
@@ -154,31 +188,186 @@ def create_yield_curve_chart(data):
         logger.error(f"Error creating yield curve chart: {str(e)}")
         return None
 
-def main():
+def create_curve_heatmap(curves):
+    """Heatmap of the interpolated yield curve over time"""
+    import numpy as np
+    import plotly.graph_objects as go
     try:
-        logger.info("Starting main dashboard function")
-        st.title("📈 Financial Markets Dashboard")
+        if curves is None or not len(curves):
+            return None
+
+        grid = np.arange(2, 31)
+        fig = go.Figure(go.Heatmap(
+            x=curves.dates,
+            y=grid,
+            z=curves.interpolate(grid).T,
+            colorscale='RdYlGn_r',
+            colorbar=dict(title='Yield (%)')
+        ))
+        fig.update_layout(
+            title='Yield Curve Over Time',
+            yaxis_title='Maturity (Years)',
+            height=350,
+            margin=dict(l=20, r=20, t=40, b=20),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        return fig
+    except Exception as e:
+        logger.error(f"Error creating yield curve heatmap: {str(e)}")
+        return None
+
+def create_spread_chart(curves):
+    """2s10s and 5s30s spreads with inversion periods shaded"""
+    import plotly.graph_objects as go
+    try:
+        if curves is None or not len(curves):
+            return None
+
+        spreads = curves.spreads()
+        fig = go.Figure()
+        for name in spreads.columns:
+            fig.add_trace(go.Scatter(x=spreads.index, y=spreads[name], mode='lines', name=name))
+        fig.add_hline(y=0, line=dict(color='grey', width=1, dash='dot'))
+
+        for _, period in curves.inversion_periods("2s10s").iterrows():
+            fig.add_vrect(x0=period["start"], x1=period["end"],
+                          fillcolor='red', opacity=0.1, line_width=0)
+
+        fig.update_layout(
+            title='Treasury Spreads (2s10s inversions shaded)',
+            yaxis_title='Spread (pp)',
+            height=300,
+            margin=dict(l=20, r=20, t=40, b=20),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        return fig
+    except Exception as e:
+        logger.error(f"Error creating spread chart: {str(e)}")
+        return None
 
-        # Initialize market data fetcher
-        market_fetcher = MarketDataFetcher()
+def create_portfolio_chart(portfolio):
+    """NAV with its drawdown from the running peak underneath"""
+    import plotly.graph_objects as go
+    try:
+        if portfolio is None or not len(portfolio):
+            return None
+
+        nav = downsample_series(portfolio.nav(), HISTORY_CHART_POINTS)
+        drawdown = portfolio.drawdown()
+        drawdown = drawdown[drawdown.index.isin(nav.index)]
+        fig = go.Figure()
+        fig.add_trace(go.Scatter(x=nav.index, y=nav.values, mode='lines', name='NAV'))
+        fig.add_trace(go.Scatter(x=drawdown.index, y=drawdown.values * 100, mode='lines', name='Drawdown',
+                                 fill='tozeroy', line=dict(color='red', width=1), yaxis='y2'))
 
-        # Get current data
-        current_data = market_fetcher.get_market_data()
+        fig.update_layout(
+            title=f'Portfolio NAV ({portfolio.base_currency})',
+            yaxis=dict(title=portfolio.base_currency, domain=[0.3, 1]),
+            yaxis2=dict(title='Drawdown (%)', domain=[0, 0.22]),
+            height=400,
+            margin=dict(l=20, r=20, t=40, b=20),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        return fig
+    except Exception as e:
+        logger.error(f"Error creating portfolio chart: {str(e)}")
+        return None
 
-        # Get historical data
-        hist_data = get_historical_data()
+def create_attribution_chart(portfolio):
+    """Change in value of each position over the range, split into price and currency effects"""
+    import plotly.graph_objects as go
+    try:
+        if portfolio is None or len(portfolio) < 2:
+            return None
 
-        # Get previous day's data
-        previous_data = hist_data.iloc[1].to_dict() if hist_data is not None and len(hist_data) > 1 else None
+        attribution = portfolio.attribution()
+        fig = go.Figure()
+        for effect, label in (("price", "Price"), ("currency", "Currency")):
+            fig.add_trace(go.Bar(x=attribution.index, y=attribution[effect], name=label))
 
-        # Check for significant changes and send notifications
-        notification_manager = NotificationManager()
-        # Only check notifications every 15 minutes to avoid spam
-        if int(time.time()) % 900 == 0:  # 900 seconds = 15 minutes
-            notification_manager.check_and_notify(current_data, previous_data)
+        fig.update_layout(
+            title=f'P&L Attribution ({portfolio.base_currency})',
+            barmode='relative',
+            height=300,
+            margin=dict(l=20, r=20, t=40, b=20),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)'
+        )
+        return fig
+    except Exception as e:
+        logger.error(f"Error creating attribution chart: {str(e)}")
+        return None
+
+def create_history_chart(history, series_label, range_name):
+    """Create a history line chart, downsampled to roughly one point per pixel"""
+    import plotly.graph_objects as go
+    try:
+        if history is None or history.empty:
+            return None
+
+        fig = go.Figure()
+        for field, label in HISTORY_SERIES[series_label].items():
+            column = value_column(field, range_name)
+            if column not in history:
+                continue
+            series = downsample_series(history[column], HISTORY_CHART_POINTS)
+            if series.empty:
+                continue
+            fig.add_trace(go.Scatter(
+                x=series.index,
+                y=series.values,
+                mode='lines',
+                name=label
+            ))
+
+        if not fig.data:
+            return None
+
+        fig.update_layout(
+            title=f'{series_label} ({range_name})',
+            height=350,
+            margin=dict(l=20, r=20, t=40, b=20),
+            paper_bgcolor='rgba(0,0,0,0)',
+            plot_bgcolor='rgba(0,0,0,0)',
+            showlegend=len(fig.data) > 1
+        )
+
+        return fig
+    except Exception as e:
+        logger.error(f"Error creating history chart: {str(e)}")
+        return None
+
+def main() -> bool:
+    """Render the page; False if it could only show an error"""
+    try:
+        logger.info("Starting main dashboard function")
+        phases = PhaseTimer("dashboard_render")
+        st.title("📈 Financial Markets Dashboard")
+
+        # Read the shared snapshot; sessions never hit the network themselves
+        snapshot = get_snapshot_provider().get()
+        phases.mark("snapshot")
+        if snapshot is None:
+            st.error("Market data is not available yet, please refresh shortly")
+            get_metrics().inc("dashboard_render_errors_total", reason="no_snapshot")
+            return False
+
+        current_data = snapshot.data["current"]
+        previous_data = snapshot.data["previous"]
+        source_timings = snapshot.data["source_timings"]
+        slow_sources = [source for source, timing in source_timings.items() if timing["status"] != "ok"]
 
         # Display last update time
-        st.caption(f"Last updated: {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')} UTC")
+        fetched_at = datetime.fromtimestamp(snapshot.fetched_at, timezone.utc)
+        st.caption(f"Last updated: {fetched_at.strftime('%Y-%m-%d %H:%M:%S')} UTC "
+                   f"(snapshot age {int(snapshot.age)}s)")
+        if not snapshot.data["history_available"]:
+            st.error("Failed to fetch historical market data")
+        if slow_sources:
+            st.warning(f"Some data unavailable (no data from: {', '.join(slow_sources)})")
 
         # Create three columns for the main indicators
         col1, col2, col3 = st.columns(3)
@@ -289,6 +478,8 @@ def main():
             )
             st.markdown("</div>", unsafe_allow_html=True)
 
+        phases.mark("indicators")
+
         # Yield Curve Section
         st.subheader("US Treasury Yield Curve")
 
@@ -318,14 +509,85 @@ def main():
                 )
                 st.markdown("</div>", unsafe_allow_html=True)
 
+        phases.mark("yield_curve")
+
+        # Yield curve history
+        curve_range = st.radio("Curve history", ["1Y", "5Y", "10Y"], horizontal=True, key="curve_range")
+        curve_history = get_history_cache().get_range(curve_range)
+        curves = YieldCurveHistory.from_frame(curve_history) if curve_history is not None else None
+        for fig in (create_curve_heatmap(curves), create_spread_chart(curves)):
+            if fig:
+                st.plotly_chart(fig, use_container_width=True)
+
+        phases.mark("curve_history")
+
+        # History Section
+        st.subheader("History")
+        series_col, range_col = st.columns([1, 2])
+        with series_col:
+            series_label = st.selectbox("Series", list(HISTORY_SERIES))
+        with range_col:
+            range_name = st.radio("Range", list(HISTORY_RANGES), index=4, horizontal=True)
+
+        history = get_history_cache().get_range(range_name)
+        history_fig = create_history_chart(history, series_label, range_name)
+        if history_fig:
+            st.plotly_chart(history_fig, use_container_width=True)
+        else:
+            st.info("No history available for this range yet")
+        phases.mark("history")
+
+        # Portfolio Section
+        st.subheader("Portfolio")
+        positions = get_positions()
+        if not positions:
+            st.info("No positions configured; set PORTFOLIO_PATH to a JSON list of positions")
+        else:
+            currency_col, portfolio_range_col = st.columns([1, 2])
+            with currency_col:
+                base_currency = st.radio("Currency", ["GBP", "USD"], horizontal=True, key="portfolio_currency")
+            with portfolio_range_col:
+                portfolio_range = st.radio("Portfolio history", ["1Y", "5Y", "10Y"], horizontal=True,
+                                           key="portfolio_range")
+
+            # Daily closes whatever the range, since NAV, drawdown and attribution are daily measures
+            portfolio_history = get_history_cache().get_range(portfolio_range, "daily")
+            portfolio = PortfolioHistory.from_frame(portfolio_history, positions, base_currency) \
+                if portfolio_history is not None else None
+            holdings = portfolio.latest() if portfolio is not None else None
+            if holdings is None:
+                st.info("No price history available to value the portfolio yet")
+            else:
+                nav_col, pnl_col, drawdown_col = st.columns(3)
+                total_cost = holdings["cost"].sum()
+                nav_col.metric(f"NAV ({base_currency})", format_value(holdings["value"].sum()))
+                pnl_col.metric("Unrealised P&L", format_value(holdings["pnl"].sum()),
+                               format_percentage(holdings["pnl"].sum() / total_cost * 100) if total_cost else None,
+                               delta_color=get_delta_color(0))
+                drawdown_col.metric(f"Max Drawdown ({portfolio_range})",
+                                    f"{portfolio.drawdown().min() * 100:.2f}%")
+
+                for fig in (create_portfolio_chart(portfolio), create_attribution_chart(portfolio)):
+                    if fig:
+                        st.plotly_chart(fig, use_container_width=True)
+                st.dataframe(holdings.round({"quantity": 6, "value": 2, "cost": 2, "pnl": 2, "return": 4}),
+                             use_container_width=True)
+        phases.mark("portfolio")
+        return True
+
     except Exception as e:
         logger.error(f"Error in main function: {str(e)}")
         logger.error(traceback.format_exc())
         st.error(f"Dashboard error: {str(e)}")
+        get_metrics().inc("dashboard_render_errors_total", reason="exception")
+        return False
 
 if __name__ == "__main__":
     try:
-        main()
+        # One cProfile dump per script run (each rerun of the page) when PROFILE_DIR is set
+        with profiled("dashboard", os.environ.get('PROFILE_DIR')):
+            main()
+        export_textfile("dashboard")
     except Exception as e:
         error_msg = f"Critical error during initialization: {str(e)}"
         logger.error(error_msg)
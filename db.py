@@ -0,0 +1,229 @@
+import logging
+import os
+import time
+import traceback
+from contextlib import contextmanager
+from threading import Condition, Lock
+from typing import Any, Dict, List, Optional, Sequence
+
+import psycopg2
+import psycopg2.extensions
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Columns of the financial_data table, timestamp first
+FINANCIAL_DATA_COLUMNS = [
+    "timestamp", "gold_usd", "gold_gbp", "gbp_usd", "sp500", "bitcoin",
+    "us_2y_yield", "us_5y_yield", "us_10y_yield", "us_30y_yield",
+    "uk_base_rate", "uk_inflation", "us_base_rate", "us_inflation"
+]
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes free within the checkout timeout"""
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of psycopg2 connections.
+
+    Connections are opened lazily up to max_size and reused across
+    checkouts. A connection that has sat idle longer than
+    health_check_after seconds is pinged before being handed out, and
+    replaced if it has gone stale. With use_prepared=True, statements run
+    through execute() are PREPAREd once per connection and EXECUTEd after.
+    """
+
+    def __init__(self, dsn: str, max_size: int = 5, checkout_timeout: float = 10.0,
+                 health_check_after: float = 30.0, use_prepared: bool = False):
+        self.dsn = dsn
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.health_check_after = health_check_after
+        self.use_prepared = use_prepared
+
+        self._cond = Condition(Lock())
+        self._idle: List[tuple] = []  # (connection, returned_at)
+        self._size = 0
+        self._prepared: Dict[int, set] = {}
+
+        self._checkouts = 0
+        self._wait_seconds = 0.0
+        self._max_wait_seconds = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+
+    def _open(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._opened += 1
+        logger.info("Opened new pooled database connection")
+        return conn
+
+    def _discard(self, conn):
+        with self._cond:
+            self._size -= 1
+            self._discarded += 1
+            self._prepared.pop(id(conn), None)
+            self._cond.notify()
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding stale database connection: {str(e)}")
+            return False
+
+    def _checkout(self):
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        while True:
+            with self._cond:
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        get_metrics().inc("db_checkout_timeouts_total")
+                        raise PoolTimeout(f"No database connection free after {self.checkout_timeout}s")
+                    self._cond.wait(remaining)
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1  # Reserve a slot before connecting outside the lock
+
+            if conn is None:
+                try:
+                    conn = self._open()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, returned_at):
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            get_metrics().observe("db_checkout_wait_seconds", waited)
+            with self._cond:
+                self._checkouts += 1
+                self._wait_seconds += waited
+                self._max_wait_seconds = max(self._max_wait_seconds, waited)
+            return conn
+
+    def _checkin(self, conn):
+        if conn.closed or conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection, committing on success and rolling back on error"""
+        conn = self._checkout()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                logger.error(f"Rollback failed: {traceback.format_exc()}")
+            raise
+        finally:
+            self._checkin(conn)
+
+    def execute(self, cur, name: str, sql: str, params: Optional[Sequence[Any]] = None):
+        """Run sql (with positional %s placeholders), as a prepared statement when enabled"""
+        with get_metrics().span("db_query", statement=name):
+            self._execute(cur, name, sql, params)
+
+    def _execute(self, cur, name: str, sql: str, params: Optional[Sequence[Any]]):
+        if not self.use_prepared:
+            cur.execute(sql, params)
+            return
+
+        conn_key = id(cur.connection)
+        with self._cond:
+            prepared = self._prepared.setdefault(conn_key, set())
+        if name not in prepared:
+            # PREPARE takes $1, $2, ... where psycopg2 takes %s
+            parts = sql.split("%s")
+            server_sql = parts[0] + "".join(f"${i}{part}" for i, part in enumerate(parts[1:], 1))
+            cur.execute(f"PREPARE {name} AS {server_sql}")
+            prepared.add(name)
+
+        if params:
+            cur.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cur.execute(f"EXECUTE {name}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool usage counters: checkouts, wait time and connection churn"""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "total_wait_seconds": round(self._wait_seconds, 4),
+                "max_wait_seconds": round(self._max_wait_seconds, 4),
+                "timeouts": self._timeouts,
+                "connections_opened": self._opened,
+                "connections_discarded": self._discarded
+            }
+
+    def close_all(self):
+        with self._cond:
+            idle, self._idle = self._idle, []
+            self._size -= len(idle)
+            self._prepared.clear()
+        for conn, _ in idle:
+            conn.close()
+
+INSERT_SQL = f"""
+    INSERT INTO financial_data ({', '.join(FINANCIAL_DATA_COLUMNS)})
+    VALUES ({', '.join(['%s'] * len(FINANCIAL_DATA_COLUMNS))})
+"""
+
+def store_market_data(pool: ConnectionPool, market_data: Dict[str, Any]):
+    """Insert one market data snapshot into financial_data"""
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            pool.execute(cur, "insert_financial_data", INSERT_SQL,
+                         [market_data.get(column) for column in FINANCIAL_DATA_COLUMNS])
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = Lock()
+
+def get_pool() -> Optional[ConnectionPool]:
+    """Return the process-wide pool for DATABASE_URL, or None if it isn't configured"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            database_url = os.environ.get('DATABASE_URL')
+            if not database_url:
+                logger.error("Database URL not found in environment")
+                return None
+            _pool = ConnectionPool(
+                database_url,
+                max_size=int(os.environ.get('DB_POOL_SIZE', 5)),
+                use_prepared=os.environ.get('DB_PREPARED_STATEMENTS', '').lower() in ('1', 'true', 'yes')
+            )
+        return _pool
@@ -0,0 +1,200 @@
+import logging
+import queue
+import smtplib
+import time
+from dataclasses import dataclass, field
+from email.mime.multipart import MIMEMultipart
+from email.mime.text import MIMEText
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class OutboundEmail:
+    subject: str
+    body: str
+    digest: bool = True  # May be merged with other digestible emails queued in the same tick
+    queued_at: float = field(default_factory=time.time)
+
+class EmailDispatcher:
+    """Background email sender that reuses one authenticated SMTP session.
+
+    enqueue() returns immediately. The sender thread waits coalesce_window
+    seconds after the first email of a tick, merges every digestible email
+    queued meanwhile into one digest message, and sends it. Failed sends
+    reconnect and retry with exponential backoff. STARTTLS and login are
+    skipped when disabled or when no password is set, so the dispatcher
+    can run against a plain local SMTP server such as aiosmtpd.
+    """
+
+    def __init__(self, host: str, port: int, sender: Optional[str], recipient: Optional[str],
+                 password: Optional[str] = None, use_starttls: bool = True,
+                 coalesce_window: float = 2.0, max_retries: int = 4, base_backoff: float = 5.0,
+                 idle_timeout: float = 120.0):
+        self.host = host
+        self.port = port
+        self.sender = sender
+        self.recipient = recipient
+        self.password = password
+        self.use_starttls = use_starttls
+        self.coalesce_window = coalesce_window
+        self.max_retries = max_retries
+        self.base_backoff = base_backoff
+        self.idle_timeout = idle_timeout
+
+        self._queue: "queue.Queue[OutboundEmail]" = queue.Queue()
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self._lock = Lock()
+        self._stats = {"queued": 0, "sent": 0, "failed": 0, "retries": 0, "connections": 0}
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name="email-dispatcher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """Send anything still queued, then close the SMTP session"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                # Closing now would cut off an in-flight send; the thread closes the session when it exits
+                logger.warning(f"Email sender still busy after {timeout}s, leaving it to finish")
+                return
+        self._close()
+
+    def enqueue(self, subject: str, body: str, digest: bool = True):
+        self.start()
+        self._queue.put(OutboundEmail(subject, body, digest))
+        with self._lock:
+            self._stats["queued"] += 1
+
+    def flush(self, timeout: float = 60.0) -> bool:
+        """Block until everything queued so far has been handled; False on timeout"""
+        deadline = time.time() + timeout
+        while self._queue.unfinished_tasks:
+            if time.time() >= deadline:
+                return False
+            time.sleep(0.05)
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats, pending=self._queue.unfinished_tasks)
+
+    def _run(self):
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                first = self._queue.get(timeout=1.0)
+            except queue.Empty:
+                self._close_if_idle()
+                continue
+
+            batch = [first]
+            if first.digest and not self._stop.is_set():
+                # Let the rest of this tick's alerts arrive
+                time.sleep(self.coalesce_window)
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            digestible = [email for email in batch if email.digest]
+            single = [email for email in batch if not email.digest]
+            messages = [(email.subject, email.body) for email in single]
+            if digestible:
+                messages.append(self._digest(digestible))
+            try:
+                for subject, body in messages:
+                    self._send_with_retry(subject, body)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+        self._close()
+
+    def _digest(self, emails: List[OutboundEmail]):
+        if len(emails) == 1:
+            return emails[0].subject, emails[0].body
+        subject = f"Market Alerts: {len(emails)} significant changes"
+        body = "\n".join(f"{email.subject}\n{email.body}\n{'-' * 40}" for email in emails)
+        return subject, body
+
+    def _connect(self) -> smtplib.SMTP:
+        with get_metrics().span("smtp_connect"):
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.use_starttls:
+                smtp.starttls()
+            if self.password:
+                smtp.login(self.sender, self.password)
+        with self._lock:
+            self._stats["connections"] += 1
+        logger.info(f"Opened SMTP session to {self.host}:{self.port}")
+        return smtp
+
+    def _session(self) -> smtplib.SMTP:
+        """Reuse the open session, reconnecting if the server dropped it"""
+        if self._smtp is not None:
+            try:
+                if self._smtp.noop()[0] == 250:
+                    return self._smtp
+            except smtplib.SMTPException:
+                pass
+            self._close()
+        self._smtp = self._connect()
+        return self._smtp
+
+    def _close(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
+
+    def _close_if_idle(self):
+        if self._smtp is not None and time.time() - self._last_used > self.idle_timeout:
+            self._close()
+
+    def _send_with_retry(self, subject: str, body: str) -> bool:
+        msg = MIMEMultipart()
+        msg['From'] = self.sender
+        msg['To'] = self.recipient
+        msg['Subject'] = subject
+        msg.attach(MIMEText(body, 'plain'))
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                with get_metrics().span("email_send"):
+                    self._session().send_message(msg)
+                self._last_used = time.time()
+                get_metrics().inc("emails_sent_total")
+                with self._lock:
+                    self._stats["sent"] += 1
+                logger.info(f"Email sent: {subject}")
+                return True
+            except Exception as e:
+                self._close()
+                if attempt == self.max_retries:
+                    break
+                delay = self.base_backoff * 2 ** attempt
+                get_metrics().inc("email_retries_total")
+                with self._lock:
+                    self._stats["retries"] += 1
+                logger.warning(f"Email send failed ({str(e)}), retrying in {delay:.0f}s")
+                time.sleep(delay)
+
+        get_metrics().inc("emails_failed_total")
+        with self._lock:
+            self._stats["failed"] += 1
+        logger.error(f"Giving up on email after {self.max_retries + 1} attempts: {subject}")
+        return False
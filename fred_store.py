@@ -0,0 +1,252 @@
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, List, Optional
+
+import pandas as pd
+
+from metrics import get_metrics
+from rate_limit import FRED_HOST, get_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# FRED series kept locally
+FRED_SERIES = {
+    "FEDFUNDS": "Federal funds effective rate",
+    "CPIAUCSL": "CPI for all urban consumers, seasonally adjusted",
+    "CPILFESL": "CPI less food and energy (core), seasonally adjusted",
+    "BOERUKM": "Bank of England policy rate, monthly",
+    "GBRCPIALLMINMEI": "UK CPI all items index (OECD), monthly",
+    "DGS2": "2-year Treasury constant maturity yield, daily"
+}
+
+# Derived measure -> (series, transform)
+DERIVED_MEASURES = {
+    "us_base_rate": ("FEDFUNDS", "level"),
+    "us_inflation": ("CPIAUCSL", "yoy"),
+    "us_inflation_mom": ("CPIAUCSL", "mom"),
+    "us_core_inflation": ("CPILFESL", "yoy"),
+    "uk_base_rate": ("BOERUKM", "level"),
+    "uk_inflation": ("GBRCPIALLMINMEI", "yoy"),
+    "us_2y_yield": ("DGS2", "level")
+}
+
+# Series -> (seconds between syncs, days its latest observation may age before the next is overdue).
+# The ages allow for publication lag: a month's CPI appears about half way through the next month.
+SERIES_SCHEDULES = {
+    "FEDFUNDS": (6 * 60 * 60, 65),
+    "CPIAUCSL": (6 * 60 * 60, 80),
+    "CPILFESL": (6 * 60 * 60, 80),
+    "BOERUKM": (6 * 60 * 60, 65),
+    "GBRCPIALLMINMEI": (6 * 60 * 60, 130),  # OECD publishes a few months behind
+    "DGS2": (30 * 60, 5)  # Business days, a day behind; synced on every hourly yield run
+}
+
+# Recent observations re-requested on every sync, since FRED revises them
+REVISION_WINDOW_DAYS = 120
+
+# Seasonal factors revise years of CPI each February, so re-read everything this often
+FULL_REFRESH_DAYS = 90
+
+def _months_ago(series: pd.Series, months: int) -> pd.Series:
+    """Value months earlier for each observation, aligned by date rather than position"""
+    return series.shift(months, freq="MS").reindex(series.index)
+
+TRANSFORMS = {
+    "level": lambda s: s,
+    "yoy": lambda s: (s / _months_ago(s, 12) - 1) * 100,
+    "mom": lambda s: (s / _months_ago(s, 1) - 1) * 100
+}
+
+class FredStore:
+    """Local SQLite copy of FRED series with their revision history.
+
+    Each sync only asks FRED for observations from REVISION_WINDOW_DAYS
+    before the last stored date (or everything on the first and periodic
+    full refreshes), and at most once per its SERIES_SCHEDULES interval
+    unless min_sync_seconds overrides it for every series. A value that differs from the stored one is kept as a new vintage
+    stamped with the day it was seen, so series can be read as they were
+    known on any earlier date.
+    """
+
+    def __init__(self, fred, path: str = ".fred_series.sqlite3", min_sync_seconds: Optional[float] = None):
+        self.fred = fred
+        self.path = path
+        self.min_sync_seconds = min_sync_seconds
+        self._lock = Lock()
+        self._sync_lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS observations (
+                series_id TEXT NOT NULL,
+                date TEXT NOT NULL,
+                realtime_start TEXT NOT NULL,
+                value REAL NOT NULL,
+                PRIMARY KEY (series_id, date, realtime_start)
+            );
+            CREATE TABLE IF NOT EXISTS series_sync (
+                series_id TEXT PRIMARY KEY,
+                last_sync REAL NOT NULL,
+                last_full_sync REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    def _sync_times(self, series_id: str):
+        with self._lock:
+            return self._conn.execute(
+                "SELECT last_sync, last_full_sync FROM series_sync WHERE series_id = ?", (series_id,)
+            ).fetchone()
+
+    def _sync_interval(self, series_id: str) -> float:
+        if self.min_sync_seconds is not None:
+            return self.min_sync_seconds
+        return SERIES_SCHEDULES[series_id][0]
+
+    def series(self, series_id: str, as_of: Optional[date] = None) -> pd.Series:
+        """Latest vintage of each observation, or the vintage known on as_of"""
+        as_of = (as_of or datetime.now(timezone.utc).date()).isoformat()
+        with self._lock:
+            rows = self._conn.execute("""
+                SELECT o.date, o.value FROM observations o
+                WHERE o.series_id = ? AND o.realtime_start = (
+                    SELECT MAX(realtime_start) FROM observations
+                    WHERE series_id = o.series_id AND date = o.date AND realtime_start <= ?
+                )
+                ORDER BY o.date
+            """, (series_id, as_of)).fetchall()
+        if not rows:
+            return pd.Series(dtype=float, name=series_id)
+        dates, values = zip(*rows)
+        return pd.Series(values, index=pd.DatetimeIndex(dates), name=series_id, dtype=float)
+
+    def sync(self, series_id: str, full: bool = False) -> Optional[int]:
+        """Fetch new and revised observations; returns how many were stored, or None on failure"""
+        with self._sync_lock:
+            now = time.time()
+            times = self._sync_times(series_id)
+            if times and not full and now - times[0] < self._sync_interval(series_id):
+                return 0
+
+            stored = self.series(series_id)
+            full = full or stored.empty or times is None or now - times[1] >= FULL_REFRESH_DAYS * 86400
+            try:
+                get_rate_limiter().acquire(FRED_HOST)
+                with get_metrics().span("upstream_request", host=FRED_HOST):
+                    if full:
+                        fetched = self.fred.get_series(series_id)
+                    else:
+                        start = stored.index.max() - timedelta(days=REVISION_WINDOW_DAYS)
+                        fetched = self.fred.get_series(series_id, observation_start=start)
+            except Exception as e:
+                logger.error(f"Error fetching {series_id} from FRED: {str(e)}")
+                return None
+
+            fetched = fetched.dropna().astype(float)
+            fetched.index = pd.DatetimeIndex(fetched.index).normalize()
+            # Keep only observations that are new or whose value was revised
+            previous = stored.reindex(fetched.index)
+            changed = fetched[previous.isna() | ((fetched - previous).abs() > 1e-9)]
+
+            vintage = datetime.now(timezone.utc).date().isoformat()
+            rows = [(series_id, day.date().isoformat(), vintage, value) for day, value in changed.items()]
+            with self._lock:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO observations (series_id, date, realtime_start, value) VALUES (?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("""
+                    INSERT INTO series_sync (series_id, last_sync, last_full_sync) VALUES (?, ?, ?)
+                    ON CONFLICT (series_id) DO UPDATE SET
+                        last_sync = excluded.last_sync,
+                        last_full_sync = CASE WHEN ? THEN excluded.last_full_sync ELSE series_sync.last_full_sync END
+                """, (series_id, now, now, full))
+                self._conn.commit()
+
+            revised = int(previous.reindex(changed.index).notna().sum())
+            logger.info(f"Synced {series_id}: {len(rows) - revised} new, {revised} revised observations")
+            return len(rows)
+
+    def sync_all(self, series_ids: Optional[List[str]] = None, full: bool = False) -> Dict[str, Optional[int]]:
+        return {series_id: self.sync(series_id, full) for series_id in (series_ids or FRED_SERIES)}
+
+    def overdue(self, series_id: str) -> bool:
+        """Whether the latest stored observation is older than the series is normally published"""
+        stored = self.series(series_id)
+        if stored.empty:
+            return True
+        age = datetime.now(timezone.utc).date() - stored.index.max().date()
+        return age > timedelta(days=SERIES_SCHEDULES[series_id][1])
+
+    def measures(self, names: Optional[List[str]] = None, as_of: Optional[date] = None) -> pd.DataFrame:
+        """Frame of derived measures (levels, YoY and MoM percent changes) on their series' observation dates"""
+        names = names or list(DERIVED_MEASURES)
+        loaded: Dict[str, pd.Series] = {}
+        columns = {}
+        for name in names:
+            series_id, transform = DERIVED_MEASURES[name]
+            if series_id not in loaded:
+                loaded[series_id] = self.series(series_id, as_of)
+            columns[name] = TRANSFORMS[transform](loaded[series_id])
+        return pd.DataFrame(columns)
+
+    def latest(self, names: Optional[List[str]] = None) -> Dict[str, Optional[float]]:
+        """Most recent value of each derived measure"""
+        frame = self.measures(names)
+        latest = {}
+        for name in frame.columns:
+            values = frame[name].dropna()
+            latest[name] = float(values.iloc[-1]) if not values.empty else None
+        return latest
+
+    def refreshed_latest(self, names: List[str]) -> Dict[str, Optional[float]]:
+        """Sync the series behind names, then return their latest values.
+
+        A measure whose series couldn't be synced is None once its stored
+        observation is overdue, so an outdated value isn't served as current.
+        """
+        series_ids = list(dict.fromkeys(DERIVED_MEASURES[name][0] for name in names))
+        synced = self.sync_all(series_ids)
+        latest = self.latest(names)
+        for name in names:
+            series_id = DERIVED_MEASURES[name][0]
+            if synced[series_id] is None and latest[name] is not None and self.overdue(series_id):
+                logger.warning(f"Not serving {name}: {series_id} failed to sync and its last observation is overdue")
+                latest[name] = None
+        return latest
+
+_store: Optional[FredStore] = None
+_store_lock = Lock()
+
+def get_fred_store(fred) -> FredStore:
+    """Return the process-wide series store at FRED_STORE_PATH"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FredStore(fred, os.environ.get('FRED_STORE_PATH', '.fred_series.sqlite3'))
+        return _store
+
+if __name__ == "__main__":
+    from fredapi import Fred
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stdout)]
+    )
+    parser = argparse.ArgumentParser(description="Manage the local copy of FRED series")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    sync_parser = subcommands.add_parser("sync", help="Fetch new and revised observations from FRED")
+    sync_parser.add_argument("--full", action="store_true", help="Re-read each series' full history")
+    args = parser.parse_args()
+
+    if args.command == "sync":
+        store = get_fred_store(Fred(api_key=os.environ.get('FRED_API_KEY')))
+        results = store.sync_all(full=args.full)
+        logger.info(f"Sync completed: {results}")
+        sys.exit(0 if all(count is not None for count in results.values()) else 1)
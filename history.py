@@ -0,0 +1,139 @@
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from threading import Lock
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from timeseries import read_series, SERIES_FIELDS
+
+logger = logging.getLogger(__name__)
+
+# Chart range -> (days of history, resolution read from the database)
+HISTORY_RANGES = {
+    "1W": (7, "raw"),
+    "1M": (31, "raw"),
+    "3M": (92, "daily"),
+    "6M": (183, "daily"),
+    "1Y": (366, "daily"),
+    "5Y": (5 * 366, "weekly"),
+    "10Y": (10 * 366, "weekly")
+}
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Positions of the points kept when downsampling with Largest-Triangle-Three-Buckets.
+
+    Keeps the first and last points and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket, which preserves peaks and troughs.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    xf = x.astype(np.float64)
+    yf = y.astype(np.float64)
+    every = (n - 2) / (threshold - 2)
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        # Average of the next bucket is the third triangle vertex
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, n)
+        if avg_start >= avg_end:
+            avg_start, avg_end = n - 1, n
+        avg_x = xf[avg_start:avg_end].mean()
+        avg_y = yf[avg_start:avg_end].mean()
+
+        range_start = int(i * every) + 1
+        range_end = int((i + 1) * every) + 1
+        area = np.abs(
+            (xf[a] - avg_x) * (yf[range_start:range_end] - yf[a])
+            - (xf[a] - xf[range_start:range_end]) * (avg_y - yf[a])
+        )
+        a = range_start + int(np.argmax(area))
+        selected[i + 1] = a
+
+    return selected
+
+def downsample_series(series: pd.Series, threshold: int) -> pd.Series:
+    """LTTB-downsample a timestamp-indexed series, ignoring missing values"""
+    series = series.dropna()
+    return series.iloc[lttb(series.index.asi8, series.to_numpy(), threshold)]
+
+def bucket_floor(ts: pd.Timestamp, resolution: str) -> pd.Timestamp:
+    """Start of the aggregation bucket containing ts, matching Postgres date_trunc"""
+    if resolution == "hourly":
+        return ts.floor("h")
+    if resolution == "daily":
+        return ts.normalize()
+    if resolution == "weekly":
+        return (ts - pd.Timedelta(days=ts.weekday())).normalize()
+    if resolution == "monthly":
+        return ts.normalize().replace(day=1)
+    return ts
+
+class HistoryCache:
+    """Incrementally loaded history frames, one per resolution.
+
+    The first request for a resolution reads its full range. Later requests
+    only read rows older than the cached start (when a longer range is
+    asked for) and the tail from the last cached bucket onwards, the latter
+    at most once every tail_refresh_seconds. reader has the signature of
+    timeseries.read_series.
+    """
+
+    def __init__(self, tail_refresh_seconds: float = 60.0, reader=read_series):
+        self.tail_refresh_seconds = tail_refresh_seconds
+        self.reader = reader
+        self._frames: Dict[str, pd.DataFrame] = {}
+        self._covered_from: Dict[str, pd.Timestamp] = {}
+        self._tail_checked: Dict[str, float] = {}
+        self._lock = Lock()
+
+    def get(self, start: datetime, resolution: str) -> Optional[pd.DataFrame]:
+        """Return history from start onwards, reading only what isn't cached yet"""
+        start = bucket_floor(pd.Timestamp(start), resolution)
+        with self._lock:
+            frame = self._frames.get(resolution)
+
+            if frame is None:
+                frame = self.reader(SERIES_FIELDS, start.to_pydatetime(), None, resolution)
+                if frame is None:
+                    return None
+                self._covered_from[resolution] = start
+                self._tail_checked[resolution] = time.monotonic()
+            else:
+                covered_from = self._covered_from[resolution]
+                if start < covered_from:
+                    head = self.reader(SERIES_FIELDS, start.to_pydatetime(),
+                                       covered_from.to_pydatetime(), resolution)
+                    if head is not None:
+                        frame = pd.concat([head, frame])
+                        self._covered_from[resolution] = start
+
+                if time.monotonic() - self._tail_checked[resolution] >= self.tail_refresh_seconds:
+                    # Re-read the last bucket too, since it may have been partial
+                    last = frame.index.max() if not frame.empty else covered_from
+                    tail = self.reader(SERIES_FIELDS, last.to_pydatetime(), None, resolution)
+                    if tail is not None:
+                        frame = pd.concat([frame[frame.index < last], tail])
+                        self._tail_checked[resolution] = time.monotonic()
+
+            self._frames[resolution] = frame
+            return frame[frame.index >= start]
+
+    def get_range(self, range_name: str, resolution: Optional[str] = None) -> Optional[pd.DataFrame]:
+        """Return history for one of HISTORY_RANGES, e.g. "1Y", at its resolution unless one is given"""
+        days, range_resolution = HISTORY_RANGES[range_name]
+        start = datetime.now(timezone.utc) - timedelta(days=days)
+        return self.get(start, resolution or range_resolution)
+
+def value_column(field: str, range_name: str) -> str:
+    """Column holding the plotted value of field for a chart range"""
+    _, resolution = HISTORY_RANGES[range_name]
+    return field if resolution == "raw" else f"{field}_close"
@@ -0,0 +1,218 @@
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+
+from benchmark import git_commit, replay_fetcher, replayed_upstreams, synthetic_history
+from metrics import get_metrics
+
+# Configure logging
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+    handlers=[logging.StreamHandler(sys.stdout)]
+)
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+class LoadResults:
+    """Latencies and outcomes of every request made by the simulated viewers"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Dict[str, int] = {}
+        self.errors = 0
+        self._lock = Lock()
+
+    def record(self, seconds: float, status: str):
+        with self._lock:
+            self.latencies.append(seconds)
+            self.statuses[status] = self.statuses.get(status, 0) + 1
+            if status == "error":
+                self.errors += 1
+
+def percentile(ordered: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+def viewer(request: Callable[[], str], results: LoadResults, stop: Event, think_time: float):
+    """One simulated session: request, pause for think_time (jittered), repeat until stopped"""
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            status = request()
+        except Exception as e:
+            logger.debug(f"Request failed: {str(e)}")
+            status = "error"
+        results.record(time.perf_counter() - started, status)
+        if think_time:
+            stop.wait(random.uniform(0.5, 1.5) * think_time)
+
+def dashboard_request() -> Callable[[], str]:
+    """One rerun of the Streamlit dashboard script, run in bare mode"""
+    # Imported here, after the working directory and upstream stubs are in place
+    import dashboard
+    # Bare mode warns about the missing script context on every widget call
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+
+    def rerun() -> str:
+        # main() catches its own errors and renders them, so use its result
+        return "ok" if dashboard.main() else "error"
+    return rerun
+
+def start_api_server() -> str:
+    """Serve api_server's Flask app on a free local port and return its payload URL"""
+    from werkzeug.serving import make_server
+
+    import api_server
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)  # No access log line per request
+    server = make_server("127.0.0.1", 0, api_server.app, threaded=True)
+    Thread(target=server.serve_forever, name="api-server", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}/api/market-data"
+
+def http_request(url: str) -> Callable[[], str]:
+    """Polls url like the HTML dashboard: one keep-alive session per viewer, revalidating with ETag"""
+    state: Dict[str, Any] = {}
+
+    def poll() -> str:
+        # Sessions aren't thread-safe, so each viewer thread gets its own
+        if "session" not in state:
+            state["session"] = requests.Session()
+        headers = {"If-None-Match": state["etag"]} if state.get("etag") else {}
+        response = state["session"].get(url, headers=headers, timeout=30)
+        if response.status_code == 200:
+            state["etag"] = response.headers.get("ETag")
+        return str(response.status_code)
+    return poll
+
+def upstream_calls() -> Dict[str, int]:
+    """Upstream requests made so far, per host, from the upstream_request spans"""
+    calls = {}
+    for host in ("query2.finance.yahoo.com", "api.stlouisfed.org", "nwp-prototype.ons.gov.uk",
+                 "www.bankofengland.co.uk"):
+        observed = get_metrics().histogram("upstream_request_seconds", host=host)
+        calls[host] = observed[0] if observed else 0
+    return calls
+
+def rate_limit_waits() -> Dict[str, float]:
+    waits = {}
+    for host in upstream_calls():
+        observed = get_metrics().histogram("rate_limit_wait_seconds", host=host)
+        waits[host] = round(observed[1], 3) if observed else 0.0
+    return waits
+
+def database_stats() -> Optional[Dict[str, Any]]:
+    from db import get_pool
+    if not os.environ.get('DATABASE_URL'):
+        return None
+    pool = get_pool()
+    return pool.stats() if pool else None
+
+def run(target: str, sessions: int, duration: float, think_time: float, url: Optional[str],
+        upstream_latency: float, rate_limits: bool) -> Dict[str, Any]:
+    results = LoadResults()
+    stop = Event()
+    original_cwd = os.getcwd()
+
+    with tempfile.TemporaryDirectory(prefix="loadtest-") as workdir, \
+            replayed_upstreams(upstream_latency, rate_limits=rate_limits):
+        # Caches, stores and logs use relative paths; keep them all out of the working tree
+        os.chdir(workdir)
+        try:
+            if url is None:
+                # Seed the local store with a year of history for the dashboard's charts
+                from columnar_store import get_store
+                get_store().append(synthetic_history(replay_fetcher(workdir).get_market_data()))
+                get_metrics().clear()
+
+            if target == "dashboard":
+                viewer_requests = [dashboard_request() for _ in range(sessions)]
+            else:
+                target_url = url or start_api_server()
+                viewer_requests = [http_request(target_url) for _ in range(sessions)]
+
+            threads = [Thread(target=viewer, args=(request, results, stop, think_time),
+                              name=f"viewer-{i}", daemon=True) for i, request in enumerate(viewer_requests)]
+            started = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            stop.wait(duration)
+            stop.set()
+            for thread in threads:
+                thread.join(60)
+            elapsed = time.perf_counter() - started
+        finally:
+            os.chdir(original_cwd)
+
+    calls = upstream_calls()
+    latencies = sorted(results.latencies)
+    summary = {
+        "requests": len(latencies),
+        "errors": results.errors,
+        "statuses": results.statuses,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2),
+            "mean": round(statistics.fmean(latencies) * 1000, 2)
+        } if latencies else None,
+        # Only counted for in-process targets, where the stubbed upstreams are in this process
+        "upstream_calls": calls if url is None else None,
+        "upstream_calls_per_viewer": round(sum(calls.values()) / sessions, 3) if url is None else None,
+        "rate_limit_wait_seconds": rate_limit_waits() if url is None else None,
+        "database": database_stats()
+    }
+    return {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "commit": git_commit(),
+        "target": url or target,
+        "sessions": sessions,
+        "duration": round(elapsed, 2),
+        "think_time": think_time,
+        "upstream_latency": upstream_latency,
+        "rate_limits": rate_limits,
+        "results": summary
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate concurrent viewers of the dashboard or the HTTP API")
+    parser.add_argument("target", choices=["dashboard", "api"],
+                        help="dashboard: rerun dashboard.py per request; api: poll /api/market-data")
+    parser.add_argument("--sessions", type=int, default=10, help="Concurrent viewers")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to generate load for")
+    parser.add_argument("--think-time", type=float, default=1.0,
+                        help="Mean seconds each viewer waits between requests (0 for back-to-back)")
+    parser.add_argument("--url", help="Poll this running API instead of an in-process server (api only)")
+    parser.add_argument("--upstream-latency", type=float, default=0.2,
+                        help="Seconds each stubbed upstream call takes")
+    parser.add_argument("--no-rate-limits", action="store_true", help="Lift the per-host upstream rate limits")
+    parser.add_argument("--database-url", help="Postgres the dashboard reads history from (default: none)")
+    parser.add_argument("--output", default="loadtest_results.json", help="Where to write the JSON report")
+    args = parser.parse_args()
+
+    if args.url and args.target != "api":
+        parser.error("--url only applies to the api target")
+    if args.database_url:
+        os.environ['DATABASE_URL'] = args.database_url
+
+    report = run(args.target, args.sessions, args.duration, args.think_time, args.url,
+                 args.upstream_latency, not args.no_rate_limits)
+    output = os.path.abspath(args.output)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    logger.info(f"Load test results: {json.dumps(report['results'], indent=2)}")
+    logger.info(f"Results written to {output}")
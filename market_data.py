@@ -1,194 +1,446 @@
 import logging
-from typing import Dict, Any, Optional
-import yfinance as yf
-from datetime import datetime, timezone, timedelta
+from typing import Dict, Any, Optional, List, Callable, Tuple
+import pandas as pd
+from datetime import date, datetime, timezone, timedelta
 import time
-from threading import Lock
-from dataclasses import dataclass
-from fredapi import Fred
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from functools import cached_property
 import os
-import requests
-from bs4 import BeautifulSoup
-
-@dataclass
-class RateLimiter:
-    calls_per_second: int
-    _last_call_time: float = 0.0
-    _lock: Lock = Lock()
-
-    def wait(self):
-        with self._lock:
-            current_time = time.time()
-            time_since_last_call = current_time - self._last_call_time
-            if time_since_last_call < 1.0 / self.calls_per_second:
-                time.sleep(1.0 / self.calls_per_second - time_since_last_call)
-            self._last_call_time = time.time()
+from cache import TTLCache
+from fred_store import FredStore, get_fred_store
+from metrics import get_metrics
+from providers import Provider, ProviderRegistry
+from rate_limit import YAHOO_HOST, get_rate_limiter
+
+# yfinance, fredapi and the scrapers (requests, bs4) are imported on first use, so
+# processes that never reach a provider don't pay for loading them
+
+# Yahoo Finance symbols for the headline prices, keyed by market data field
+PRICE_SYMBOLS = {
+    "gold_usd": "GC=F",
+    "gbp_usd": "GBPUSD=X",
+    "sp500": "^GSPC",
+    "bitcoin": "BTC-USD"
+}
+
+# Yahoo Finance symbols for the US Treasury yield curve. Yahoo has no 2-year
+# index (^IRX is the 13-week bill), so us_2y_yield comes from FRED's DGS2.
+YIELD_CURVE_SYMBOLS = {
+    "us_5y_yield": "^FVX",
+    "us_10y_yield": "^TNX",
+    "us_30y_yield": "^TYX"
+}
+
+# Fields fetched together in get_market_data_concurrent, named after their primary provider
+SOURCE_FIELDS = {
+    "yahoo": list(PRICE_SYMBOLS) + list(YIELD_CURVE_SYMBOLS),
+    "ons": ["uk_inflation"],
+    "boe": ["uk_base_rate"],
+    "fred": ["us_base_rate", "us_inflation", "us_2y_yield"]
+}
+
+# Fields refreshed by get_macro_rates
+MACRO_FIELDS = ["uk_inflation", "uk_base_rate", "us_base_rate", "us_inflation"]
+
+# Seconds each source may take in get_market_data_concurrent before it is dropped
+DEFAULT_SOURCE_TIMEOUTS = {
+    "yahoo": 10.0,
+    "ons": 8.0,
+    "boe": 8.0,
+    "fred": 8.0
+}
+
+# Fields computed from others by add_derived_fields
+DERIVED_FIELDS = ["gold_gbp"]
+
+# Field values and the provider each value came from
+SourcedValues = Tuple[Dict[str, Optional[float]], Dict[str, str]]
+
+def add_derived_fields(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Fill in fields computed from others, such as gold priced in GBP"""
+    # Calculate Gold in GBP
+    if data.get("gold_usd") and data.get("gbp_usd"):
+        data["gold_gbp"] = data["gold_usd"] / data["gbp_usd"]
+    else:
+        data["gold_gbp"] = None
+    return data
+
+def value_sources(data: Dict[str, Any], sources: Dict[str, str]) -> Dict[str, str]:
+    """Provider of each value in a snapshot; computed fields are "derived" """
+    return {
+        field: "derived" if field in DERIVED_FIELDS else sources.get(field)
+        for field, value in data.items()
+        if field not in ("timestamp", "sources") and value is not None
+    }
+
+def _timed(fetch: Callable[[], SourcedValues]) -> Tuple[SourcedValues, float]:
+    """Run a source fetch and return its result with the elapsed seconds"""
+    started = time.monotonic()
+    result = fetch()
+    return result, time.monotonic() - started
 
 class MarketDataFetcher:
-    def __init__(self):
+    def __init__(self, request_timeout: float = 10.0, cache: Optional[TTLCache] = None):
         self.logger = logging.getLogger(__name__)
-        self.rate_limiter = RateLimiter(calls_per_second=2)
-        self.fred = Fred(api_key=os.environ.get('FRED_API_KEY'))
-        self.ninjas_api_key = os.environ.get('API_NINJAS_KEY')
-        self.ninjas_headers = {'X-Api-Key': self.ninjas_api_key}
+        self.request_timeout = request_timeout
+        self.cache = cache
+        self.rate_limiter = get_rate_limiter()
+        self.registry = self._build_registry()
+
+    @cached_property
+    def fred(self):
+        """FRED client, created on first use"""
+        from fredapi import Fred
+        return Fred(api_key=os.environ.get('FRED_API_KEY'))
+
+    @cached_property
+    def fred_store(self) -> FredStore:
+        return get_fred_store(self.fred)
+
+    @cached_property
+    def uk_scraper(self):
+        """ONS and Bank of England scrapers, created on first use"""
+        from scrapers import ConditionalFetcher, UKRatesScraper
+        return UKRatesScraper(ConditionalFetcher(timeout=self.request_timeout))
+
+    def get_prices(self) -> Dict[str, Optional[float]]:
+        """Get the headline prices (gold, GBP/USD, S&P 500, Bitcoin) in one bulk download"""
+        return self.get_prices_with_sources()[0]
+
+    def get_prices_with_sources(self) -> SourcedValues:
+        quotes = self.get_quotes(list(PRICE_SYMBOLS.values()))
+        return self._from_yahoo({field: quotes.get(symbol) for field, symbol in PRICE_SYMBOLS.items()})
 
     def get_forex_rate(self, symbol: str = "GBPUSD=X") -> Optional[float]:
-        return self.get_stock_data(symbol)
+        return self.get_quotes([symbol]).get(symbol)
 
     def get_us_yield_curve(self) -> Dict[str, Optional[float]]:
-        yields = {
-            "us_2y_yield": self.get_stock_data("^IRX"),
-            "us_5y_yield": self.get_stock_data("^FVX"),
-            "us_10y_yield": self.get_stock_data("^TNX"),
-            "us_30y_yield": self.get_stock_data("^TYX")
-        }
-        return yields
+        return self.get_us_yield_curve_with_sources()[0]
+
+    def get_us_yield_curve_with_sources(self) -> SourcedValues:
+        quotes = self.get_quotes(list(YIELD_CURVE_SYMBOLS.values()))
+        yields = {field: quotes.get(symbol) for field, symbol in YIELD_CURVE_SYMBOLS.items()}
+        curve, sources = self._from_yahoo(yields)
+        values, found = self.fetch_fields_with_sources(["us_2y_yield"])
+        curve.update(values)
+        sources.update(found)
+        return curve, sources
+
+    @staticmethod
+    def _from_yahoo(values: Dict[str, Optional[float]]) -> SourcedValues:
+        """Attribute values fetched outside the registry to Yahoo"""
+        return values, {field: "yahoo" for field, value in values.items() if value is not None}
 
     def get_stock_data(self, symbol: str, period: str = "1d") -> Optional[float]:
+        return self.get_quotes([symbol], period=period).get(symbol)
+
+    def get_quotes(self, symbols: List[str], period: str = "5d") -> Dict[str, Optional[float]]:
+        """Get the latest close for several symbols in a single bulk download"""
+        quotes = {symbol: None for symbol in symbols}
+        if not symbols:
+            return quotes
+
         try:
-            self.rate_limiter.wait()
-            ticker = yf.Ticker(symbol)
-            data = ticker.history(period=period)
-            return float(data["Close"].iloc[-1]) if not data.empty else None
+            import yfinance as yf
+            self.rate_limiter.acquire(YAHOO_HOST)
+            with get_metrics().span("upstream_request", host=YAHOO_HOST):
+                data = yf.download(
+                    tickers=list(quotes),
+                    period=period,
+                    group_by="column",
+                    auto_adjust=True,
+                    progress=False
+                )
+            if data.empty:
+                self.logger.warning(f"No quote data returned for {list(quotes)}")
+                return quotes
+
+            closes = data["Close"]
+            # A single ticker may come back as a Series rather than a frame
+            if not hasattr(closes, "columns"):
+                closes = closes.to_frame(name=symbols[0])
+
+            for symbol in quotes:
+                if symbol not in closes.columns:
+                    continue
+                # Markets trade different hours, so take each symbol's last valid close
+                series = closes[symbol].dropna()
+                if not series.empty:
+                    quotes[symbol] = float(series.iloc[-1])
+            return quotes
         except Exception as e:
-            self.logger.error(f"Error fetching stock data for {symbol}: {str(e)}")
-            return None
+            self.logger.error(f"Error fetching quotes for {list(quotes)}: {str(e)}")
+            return quotes
+
+    def get_macro_rates(self) -> Dict[str, Optional[float]]:
+        """Get UK and US base rates and inflation, failing over between providers"""
+        return self.fetch_fields(MACRO_FIELDS)
+
+    def get_macro_rates_with_sources(self) -> SourcedValues:
+        return self.fetch_fields_with_sources(MACRO_FIELDS)
+
+    def get_quote_history(self, symbols: List[str], start: date, end: date) -> pd.DataFrame:
+        """Get daily closes for several symbols between start and end in one bulk download"""
+        import yfinance as yf
+        self.rate_limiter.acquire(YAHOO_HOST)
+        with get_metrics().span("upstream_request", host=YAHOO_HOST):
+            data = yf.download(
+                tickers=list(symbols),
+                start=start,
+                end=end + timedelta(days=1),  # Yahoo treats end as exclusive
+                interval="1d",
+                group_by="column",
+                auto_adjust=True,
+                progress=False
+            )
+        if data.empty:
+            return pd.DataFrame(columns=list(symbols), dtype=float)
+
+        closes = data["Close"]
+        if not hasattr(closes, "columns"):
+            closes = closes.to_frame(name=symbols[0])
+
+        index = pd.DatetimeIndex(closes.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        closes.index = index.normalize()
+        return closes
 
     def get_uk_rates(self) -> Dict[str, Optional[float]]:
         """Get UK base rate and inflation rate"""
-        # Initialize default return structure
-        rates = {
-            "uk_base_rate": None,
-            "uk_inflation": None
-        }
+        rates = {}
+        rates.update(self.get_uk_inflation())
+        rates.update(self.get_uk_base_rate())
+        self.logger.info(f"UK rates: {rates}")
+        return rates
 
-        try:
-            # Get UK inflation from ONS website
-            url = "https://nwp-prototype.ons.gov.uk/economy/inflation-and-price-indices/"
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-            }
+    def get_uk_inflation(self) -> Dict[str, Optional[float]]:
+        """Get UK CPI inflation from the ONS website"""
+        rates = {"uk_inflation": None}
 
+        try:
             self.logger.info("Fetching UK inflation data from ONS")
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Find the specific div with CPI information
-            cpi_div = soup.find('div', class_='featured-chart__item-description')
-            if cpi_div:
-                text = cpi_div.text.strip()
-                # Extract CPI (not CPIH) figure
-                cpi_part = text.split('CPI')[1]
-                rates["uk_inflation"] = float(cpi_part.split('rose by')[1].split('%')[0].strip())
+            rates["uk_inflation"] = self.uk_scraper.get_inflation()
+            if rates["uk_inflation"] is not None:
                 self.logger.info(f"Retrieved UK inflation rate: {rates['uk_inflation']}%")
+            return rates
+
+        except Exception as e:
+            self.logger.error(f"Error fetching UK inflation: {str(e)}")
+            return rates  # Return the initialized dictionary with None values
 
-            # Get UK Bank Rate from Bank of England website
-            url = "https://www.bankofengland.co.uk/boeapps/database/Bank-Rate.asp"
-
-            # Create a session to handle cookies
-            session = requests.Session()
-            cookies = {
-                'cookie_consent': 'accepted',
-                'cookie_consent_essential': 'accepted',
-                'cookie_consent_analytics': 'accepted'
-            }
-
-            # Make request with cookies
-            response = session.get(url, headers=headers, cookies=cookies)
-            response.raise_for_status()
-
-            soup = BeautifulSoup(response.text, 'html.parser')
-
-            # Find the table with the rates
-            table = soup.find('table')
-            if table:
-                # Get the first row (most recent rate)
-                rows = table.find_all('tr')
-                if len(rows) > 1:  # Ensure we have at least one data row
-                    latest_row = rows[1]  # Skip header row
-                    cells = latest_row.find_all('td')
-                    if len(cells) > 1:  # Ensure we have the rate cell
-                        rates["uk_base_rate"] = float(cells[1].text.strip().replace('%', ''))
-                        self.logger.info(f"Retrieved UK base rate: {rates['uk_base_rate']}%")
-
-            self.logger.info(f"UK rates: {rates}")
+    def _get_boe_rate_rows(self) -> List[List[str]]:
+        """Download the Bank of England Bank Rate table as rows of cell text, newest first"""
+        return self.uk_scraper.get_bank_rate_rows()
+
+    def get_uk_base_rate(self) -> Dict[str, Optional[float]]:
+        """Get UK Bank Rate from the Bank of England website"""
+        rates = {"uk_base_rate": None}
+
+        try:
+            self.logger.info("Fetching UK base rate from Bank of England")
+            rates["uk_base_rate"] = self.uk_scraper.get_bank_rate()
+            if rates["uk_base_rate"] is not None:
+                self.logger.info(f"Retrieved UK base rate: {rates['uk_base_rate']}%")
             return rates
 
         except Exception as e:
-            self.logger.error(f"Error fetching UK rates: {str(e)}")
+            self.logger.error(f"Error fetching UK base rate: {str(e)}")
             return rates  # Return the initialized dictionary with None values
 
+    def get_uk_base_rate_history(self) -> pd.Series:
+        """Get every Bank Rate change from the Bank of England, indexed by date changed"""
+        rows = self._get_boe_rate_rows()
+        dates = pd.to_datetime([row[0] for row in rows], format="%d %b %y", errors="coerce")
+        rates = pd.to_numeric([row[1].replace('%', '') for row in rows], errors="coerce")
+        history = pd.Series(rates, index=dates, name="uk_base_rate")
+        history = history[history.index.notna()].dropna()
+        # The table is newest first, so keep the latest change on any repeated date
+        return history[~history.index.duplicated(keep="first")].sort_index()
+
     def get_us_rates(self) -> Dict[str, Optional[float]]:
-        """Get US federal funds rate and inflation rate using FRED API"""
+        """Get US federal funds rate and YoY CPI inflation from the local FRED series store"""
         try:
-            # Get latest Federal Funds Rate
-            fed_rate = self.fred.get_series('FEDFUNDS', 
-                                             observation_start=datetime.now() - timedelta(days=30))
-            latest_rate = float(fed_rate.iloc[-1])
-
-            # Get CPI data for last 13 months to calculate YoY inflation
-            cpi = self.fred.get_series('CPIAUCSL', 
-                                        observation_start=datetime.now() - timedelta(days=400))
-            latest_cpi = float(cpi.iloc[-1])
-            year_ago_cpi = float(cpi.iloc[-13])  # 13 months ago
-            inflation_rate = ((latest_cpi - year_ago_cpi) / year_ago_cpi) * 100
-
-            rates = {
-                "us_base_rate": latest_rate,
-                "us_inflation": inflation_rate
-            }
+            # Only fetches observations FRED may have added or revised since the last sync
+            rates = self.fred_store.refreshed_latest(["us_base_rate", "us_inflation"])
+            if any(value is None for value in rates.values()):
+                raise RuntimeError("FRED series store has no current data")
             self.logger.info(f"US rates from FRED: {rates}")
             return rates
         except Exception as e:
             self.logger.error(f"Error fetching US rates from FRED: {str(e)}")
-            # Fallback to Yahoo Finance data if FRED fails
-            try:
-                us_base = self.get_stock_data("^IRX")  # US 13-week Treasury Bill rate
-                us_tips = self.get_stock_data("^TNX")  # US 10Y Treasury yield as inflation indicator
-
-                # Convert basis points to percentage only if us_base is not None
-                if us_base is not None:
-                    us_base = us_base / 100
-
-                rates = {
-                    "us_base_rate": us_base,
-                    "us_inflation": us_tips
-                }
-                self.logger.info(f"US rates from Yahoo Finance (fallback): {rates}")
-                return rates
-            except Exception as fallback_error:
-                self.logger.error(f"Error fetching US rates fallback: {str(fallback_error)}")
-                return {"us_base_rate": None, "us_inflation": None}
+            return {"us_base_rate": None, "us_inflation": None}
 
-    def get_market_data(self) -> Dict[str, Any]:
+    def get_us_2y_yield(self) -> Dict[str, Optional[float]]:
+        """Get the 2-year Treasury yield (DGS2, published daily with a one-day lag) from the FRED series store"""
+        try:
+            return self.fred_store.refreshed_latest(["us_2y_yield"])
+        except Exception as e:
+            self.logger.error(f"Error fetching the 2-year Treasury yield from FRED: {str(e)}")
+            return {"us_2y_yield": None}
+
+    def get_us_2y_yield_history(self, start: date, end: date) -> pd.Series:
+        """Get daily 2-year Treasury yields from the FRED series store"""
+        self.fred_store.sync_all(["DGS2"])
+        history = self.fred_store.measures(["us_2y_yield"])["us_2y_yield"].dropna()
+        # Keep the last observation before start so the first days have a value to carry forward
+        before = history.loc[:pd.Timestamp(start) - pd.Timedelta(days=1)].tail(1)
+        return pd.concat([before, history.loc[pd.Timestamp(start):pd.Timestamp(end)]])
+
+    def get_uk_rates_from_fred(self) -> Dict[str, Optional[float]]:
+        """UK Bank Rate and YoY CPI from monthly FRED series; a lagging fallback for the scrapers"""
         try:
-            data = {
-                "timestamp": datetime.now(timezone.utc).isoformat(),
-                "gold_usd": self.get_stock_data("GC=F"),
-                "gbp_usd": self.get_forex_rate(),
-                "sp500": self.get_stock_data("^GSPC"),
-                "bitcoin": self.get_stock_data("BTC-USD"),
-            }
-
-            # Get rates data
-            uk_rates = self.get_uk_rates()
-            us_rates = self.get_us_rates()
-
-            # Update the data dictionary with all rates
-            data.update(self.get_us_yield_curve())
-            data.update(uk_rates)
-            data.update(us_rates)
-
-            # Calculate Gold in GBP
-            if data["gold_usd"] and data["gbp_usd"]:
-                data["gold_gbp"] = data["gold_usd"] / data["gbp_usd"]
+            rates = self.fred_store.refreshed_latest(["uk_base_rate", "uk_inflation"])
+            self.logger.info(f"UK rates from FRED: {rates}")
+            return rates
+        except Exception as e:
+            self.logger.error(f"Error fetching UK rates from FRED: {str(e)}")
+            return {"uk_base_rate": None, "uk_inflation": None}
+
+    def get_us_rates_history(self, start: date, end: date) -> pd.DataFrame:
+        """Get monthly US federal funds rate and YoY CPI inflation from the FRED series store"""
+        self.fred_store.sync_all(["FEDFUNDS", "CPIAUCSL"])
+        measures = self.fred_store.measures(["us_base_rate", "us_inflation"])
+        # Keep the last observation before start so the first days have a value to carry forward
+        before = measures.loc[:pd.Timestamp(start) - pd.Timedelta(days=1)].tail(1)
+        return pd.concat([before, measures.loc[pd.Timestamp(start):pd.Timestamp(end)]])
+
+    def get_yahoo_data(self) -> Dict[str, Optional[float]]:
+        """Get every price and yield field from Yahoo Finance in one bulk download.
+
+        With a cache attached, prices and yields expire on their own TTLs and
+        only the groups that have gone stale are downloaded.
+        """
+        groups = {
+            "yahoo:prices": ("price", PRICE_SYMBOLS),
+            "yahoo:yields": ("yield", YIELD_CURVE_SYMBOLS)
+        }
+        data = {}
+        stale = {}
+        for key, group in groups.items():
+            cached = self.cache.get(key) if self.cache else None
+            if cached is not None:
+                data.update(cached)
             else:
-                data["gold_gbp"] = None
+                stale[key] = group
+
+        if stale:
+            quotes = self.get_quotes([symbol for _, symbols in stale.values() for symbol in symbols.values()])
+            for key, (field_class, symbols) in stale.items():
+                values = {field: quotes.get(symbol) for field, symbol in symbols.items()}
+                data.update(values)
+                if self.cache and any(v is not None for v in values.values()):
+                    self.cache.set(key, values, field_class)
+        return data
+
+    def _cached(self, key: str, field_class: str,
+                fetch: Callable[[], Dict[str, Optional[float]]]) -> Callable[[], Dict[str, Optional[float]]]:
+        """Wrap a source fetch so it is served from the cache while fresh"""
+        if self.cache is None:
+            return fetch
+        return lambda: self.cache.get_or_fetch(key, field_class, fetch)
+
+    def _build_registry(self) -> ProviderRegistry:
+        """Providers in preference order for each field they supply"""
+        registry = ProviderRegistry()
+        registry.register(Provider("yahoo", self.get_yahoo_data, SOURCE_FIELDS["yahoo"]))
+        registry.register(Provider("ons", self._cached("ons", "macro", self.get_uk_inflation), ["uk_inflation"]))
+        registry.register(Provider("boe", self._cached("boe", "macro", self.get_uk_base_rate), ["uk_base_rate"]))
+        registry.register(Provider("fred", self._cached("fred", "macro", self.get_us_rates),
+                                   ["us_base_rate", "us_inflation"]))
+        registry.register(Provider("fred_yields", self._cached("fred_yields", "yield", self.get_us_2y_yield),
+                                   ["us_2y_yield"]))
+        registry.register(Provider("fred_uk", self._cached("fred_uk", "macro", self.get_uk_rates_from_fred),
+                                   ["uk_base_rate", "uk_inflation"]))
+        return registry
 
-            self.logger.info(f"Complete market data: {data}")
-            return data
+    def fetch_fields(self, fields: List[str]) -> Dict[str, Optional[float]]:
+        """Fetch fields through the provider registry"""
+        return self.registry.fetch(fields)[0]
+
+    def fetch_fields_with_sources(self, fields: List[str]) -> SourcedValues:
+        """Fetch fields through the provider registry, along with the provider of each value"""
+        return self.registry.fetch(fields)
+
+    def _fetch_source(self, source: str, fields: List[str]) -> SourcedValues:
+        with get_metrics().span("source_fetch", source=source):
+            return self.fetch_fields_with_sources(fields)
+
+    def _source_fetchers(self) -> Dict[str, Callable[[], SourcedValues]]:
+        """Map each field group to a timed fetch of its fields through the registry"""
+        return {
+            source: (lambda source=source, fields=fields: self._fetch_source(source, fields))
+            for source, fields in SOURCE_FIELDS.items()
+        }
+
+    def _finish_market_data(self, data: Dict[str, Any], sources: Dict[str, str]) -> Dict[str, Any]:
+        """Add derived fields and the provider of each value to a market data snapshot"""
+        add_derived_fields(data)
+        data["sources"] = value_sources(data, sources)
+        self.logger.info(f"Complete market data: {data}")
+        return data
+
+    def get_market_data(self) -> Dict[str, Any]:
+        try:
+            data = {"timestamp": datetime.now(timezone.utc).isoformat()}
+            sources: Dict[str, str] = {}
+
+            # Fetch each source in turn: Yahoo prices and yields, then UK and US rates
+            for fetch in self._source_fetchers().values():
+                values, found = fetch()
+                data.update(values)
+                sources.update(found)
+
+            return self._finish_market_data(data, sources)
         except Exception as e:
             self.logger.error(f"Error fetching market data: {str(e)}")
-            raise
\ No newline at end of file
+            raise
+
+    def get_market_data_concurrent(
+        self, timeouts: Optional[Dict[str, float]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Dict[str, Any]]]:
+        """Fetch all sources in parallel, each bounded by its own deadline.
+
+        Returns the market data snapshot and per-source timings, whose status
+        is "ok", "empty" (no field had a value), "timeout" or "error". A
+        source that misses its deadline contributes None for its fields
+        rather than holding up the snapshot.
+        """
+        timeouts = {**DEFAULT_SOURCE_TIMEOUTS, **(timeouts or {})}
+        fetchers = self._source_fetchers()
+        data = {"timestamp": datetime.now(timezone.utc).isoformat()}
+        # Provenance is only taken from results this call received, never from stragglers
+        sources: Dict[str, str] = {}
+        timings = {}
+
+        executor = ThreadPoolExecutor(max_workers=len(fetchers), thread_name_prefix="market-data")
+        try:
+            started = time.monotonic()
+            futures = {source: executor.submit(_timed, fetch) for source, fetch in fetchers.items()}
+
+            for source, future in futures.items():
+                # Every source started together, so each deadline runs from the same start
+                remaining = max(0.0, started + timeouts[source] - time.monotonic())
+                try:
+                    (result, found), elapsed = future.result(timeout=remaining)
+                    data.update(result)
+                    sources.update(found)
+                    # Providers that fail fast or have an open circuit return all None rather than raising
+                    status = "ok" if any(value is not None for value in result.values()) else "empty"
+                except FutureTimeoutError:
+                    self.logger.warning(f"Source {source} missed its {timeouts[source]}s deadline")
+                    get_metrics().inc("source_timeouts_total", source=source)
+                    data.update({field: None for field in SOURCE_FIELDS[source]})
+                    status, elapsed = "timeout", time.monotonic() - started
+                except Exception as e:
+                    self.logger.error(f"Error fetching {source} data: {str(e)}")
+                    data.update({field: None for field in SOURCE_FIELDS[source]})
+                    status, elapsed = "error", time.monotonic() - started
+
+                timings[source] = {"status": status, "seconds": round(elapsed, 3)}
+        finally:
+            # Don't wait on stragglers; their results are simply discarded
+            executor.shutdown(wait=False, cancel_futures=True)
+
+        self.logger.info(f"Source timings: {timings}")
+        return self._finish_market_data(data, sources), timings
@@ -1,37 +1,37 @@
 import os
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 from datetime import datetime, timezone
 import logging
 import traceback
+from alert_rules import load_rules
+from email_delivery import EmailDispatcher
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class NotificationManager:
-    def __init__(self):
-        self.thresholds = {
-            'gold_usd': 1.0,    # 1% change
-            'bitcoin': 2.0,     # 2% change
-            'sp500': 1.0,       # 1% change
-            'gbp_usd': 0.5,     # 0.5% change
-            'us_10y_yield': 0.1,# 0.1 percentage point change
-            'uk_inflation': 0.2,# 0.2 percentage point change
-            'us_inflation': 0.2 # 0.2 percentage point change
-        }
-
-        # Email configuration
-        self.smtp_server = "smtp.gmail.com"
-        self.smtp_port = 587
+    def __init__(self, coalesce_window=2.0):
+        self.rules = load_rules()
+
+        # Email configuration; point SMTP_SERVER/SMTP_PORT at a local server
+        # (e.g. aiosmtpd with SMTP_STARTTLS=0) to test delivery
+        self.smtp_server = os.getenv('SMTP_SERVER', "smtp.gmail.com")
+        self.smtp_port = int(os.getenv('SMTP_PORT', 587))
+        self.smtp_starttls = os.getenv('SMTP_STARTTLS', '1').lower() not in ('0', 'false', 'no')
         self.sender_email = os.getenv('NOTIFICATION_EMAIL')
         self.sender_password = os.getenv('NOTIFICATION_PASSWORD')
         self.recipient_email = os.getenv('RECIPIENT_EMAIL')
 
+        # Emails are queued and sent in the background over one reused session
+        self.dispatcher = EmailDispatcher(
+            self.smtp_server, self.smtp_port, self.sender_email, self.recipient_email,
+            password=self.sender_password, use_starttls=self.smtp_starttls,
+            coalesce_window=coalesce_window
+        )
+
         # Track last summary sent
         self.last_summary_date = None
 
-    def format_alert_message(self, asset, current_value, previous_value, percent_change):
+    def format_alert_message(self, asset, current_value, previous_value, percent_change, unit='%'):
         """Format the email alert message"""
         return f"""
 Market Alert: Significant change detected
@@ -39,40 +39,35 @@ Market Alert: Significant change detected
 Asset: {asset}
 Current Value: {current_value:.2f}
 Previous Value: {previous_value:.2f}
-Change: {percent_change:+.2f}%
+Change: {percent_change:+.2f}{unit}
 
 Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S UTC')}
 """
 
-    def send_email_alert(self, subject, message):
-        """Send email alert"""
+    def send_email_alert(self, subject, message, digest=False):
+        """Queue an email for background delivery; digest emails from the same tick are sent as one"""
         try:
-            logger.info(f"Attempting to send email: {subject}")
-
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.sender_email
-            msg['To'] = self.recipient_email
-            msg['Subject'] = subject
-
-            # Add message body
-            msg.attach(MIMEText(message, 'plain'))
-
-            # Create SMTP session
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                logger.info("Establishing SMTP connection...")
-                server.starttls()
-                server.login(self.sender_email, self.sender_password)
-                server.send_message(msg)
+            if not all([self.sender_email, self.recipient_email]):
+                logger.error("Missing email configuration")
+                return False
 
-            logger.info(f"Alert email sent successfully: {subject}")
+            self.dispatcher.enqueue(subject, message, digest=digest)
+            logger.info(f"Email queued: {subject}")
             return True
 
         except Exception as e:
-            logger.error(f"Failed to send email alert: {str(e)}")
+            logger.error(f"Failed to queue email alert: {str(e)}")
             logger.error(f"Full error details: {traceback.format_exc()}")
             return False
 
+    def flush(self, timeout=60.0):
+        """Wait for queued emails to be sent"""
+        return self.dispatcher.flush(timeout)
+
+    def close(self, timeout=60.0):
+        """Send any queued emails and close the SMTP session"""
+        self.dispatcher.stop(timeout)
+
     def format_daily_summary(self, current_data):
         """Format the daily summary email"""
         def format_value(value, is_currency=False, is_percentage=False, currency_symbol=''):
@@ -149,19 +144,15 @@ US Treasury Yields
                 logger.debug("Not time for daily summary yet")
                 return False
 
-            if not all([self.sender_email, self.sender_password, self.recipient_email]):
-                logger.error("Missing email configuration")
-                return False
-
             logger.info("Preparing daily summary email...")
             subject = f"Daily Market Dashboard Summary - {datetime.now().strftime('%Y-%m-%d')}"
             message = self.format_daily_summary(current_data)
             success = self.send_email_alert(subject, message)
 
             if success:
-                logger.info("Daily summary email sent successfully")
+                logger.info("Daily summary email queued")
             else:
-                logger.error("Failed to send daily summary email")
+                logger.error("Failed to queue daily summary email")
 
             return success
         except Exception as e:
@@ -178,21 +169,20 @@ US Treasury Yields
         if not previous_data or not current_data:
             return
 
-        for asset, threshold in self.thresholds.items():
-            if asset not in current_data or asset not in previous_data:
-                continue
-
-            current_value = current_data[asset]
-            previous_value = previous_data[asset]
-
-            if not current_value or not previous_value:
+        alerts = []
+        for rule in self.rules:
+            if rule.field not in current_data or rule.field not in previous_data:
                 continue
-
-            percent_change = ((current_value - previous_value) / previous_value) * 100
-
-            if abs(percent_change) >= threshold:
-                subject = f"Market Alert: {asset} moved by {percent_change:+.2f}%"
-                message = self.format_alert_message(
-                    asset, current_value, previous_value, percent_change
-                )
-                self.send_email_alert(subject, message)
\ No newline at end of file
+            alert = rule.compare(current_data[rule.field], previous_data[rule.field])
+            if alert:
+                alerts.append(alert)
+
+        self.send_alerts(alerts)
+
+    def send_alerts(self, alerts):
+        """Queue each triggered alert; alerts from the same tick go out as one digest"""
+        for alert in alerts:
+            message = self.format_alert_message(
+                alert.asset, alert.current_value, alert.previous_value, alert.change, alert.unit
+            )
+            self.send_email_alert(alert.subject, message, digest=True)
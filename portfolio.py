@@ -0,0 +1,157 @@
+import json
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Holdable assets -> financial_data field with their USD price per unit
+ASSET_PRICES = {
+    "gold": "gold_usd",
+    "sp500": "sp500",
+    "bitcoin": "bitcoin"
+}
+
+CURRENCIES = ("GBP", "USD")
+
+@dataclass
+class Position:
+    """quantity units of asset bought for cost_basis in total, accounted in currency"""
+    asset: str
+    quantity: float
+    cost_basis: float
+    currency: str = "GBP"
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.asset not in ASSET_PRICES:
+            raise ValueError(f"Unknown asset {self.asset!r}, expected one of {list(ASSET_PRICES)}")
+        if self.currency not in CURRENCIES:
+            raise ValueError(f"Unknown currency {self.currency!r}, expected one of {list(CURRENCIES)}")
+        self.name = self.name or f"{self.asset} ({self.currency})"
+
+def positions_from_config(config: List[Dict[str, Any]]) -> List[Position]:
+    """Build positions from entries such as {"asset": "gold", "quantity": 10, "cost_basis": 15000, "currency": "GBP"}"""
+    return [Position(**entry) for entry in config]
+
+def load_positions(path: Optional[str] = None) -> List[Position]:
+    """Positions from a JSON config file (PORTFOLIO_PATH by default); none if unset or unreadable"""
+    path = path or os.getenv('PORTFOLIO_PATH')
+    if not path:
+        return []
+    try:
+        with open(path) as f:
+            return positions_from_config(json.load(f))
+    except Exception as e:
+        logger.error(f"Could not load portfolio positions from {path}: {str(e)}")
+        return []
+
+def _per_usd(gbp_usd: np.ndarray, currency: str) -> np.ndarray:
+    """Units of currency one US dollar buys on each date"""
+    return 1.0 / gbp_usd if currency == "GBP" else np.ones_like(gbp_usd)
+
+class PortfolioHistory:
+    """Daily valuation of a set of positions over the stored history.
+
+    Prices are held as a dates x positions matrix of USD prices with GBP/USD
+    alongside, and every figure is computed over the whole matrix at once.
+    A missing price carries the last stored one forward; dates before every
+    input has an observation are dropped. Values and P&L are reported in
+    base_currency.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, prices: np.ndarray, gbp_usd: np.ndarray,
+                 positions: List[Position], base_currency: str = "GBP"):
+        if base_currency not in CURRENCIES:
+            raise ValueError(f"Unknown currency {base_currency!r}, expected one of {list(CURRENCIES)}")
+        self.dates = pd.DatetimeIndex(dates)
+        self.prices = np.asarray(prices, dtype=np.float64).reshape(len(self.dates), len(positions))
+        self.gbp_usd = np.asarray(gbp_usd, dtype=np.float64)
+        self.positions = list(positions)
+        self.base_currency = base_currency
+        self.names = [position.name for position in self.positions]
+        self.quantities = np.array([position.quantity for position in self.positions], dtype=np.float64)
+        self.cost_basis = np.array([position.cost_basis for position in self.positions], dtype=np.float64)
+
+        # Base currency per USD on each date, and per unit of each position's currency
+        self.base_per_usd = _per_usd(self.gbp_usd, base_currency)
+        local_per_usd = np.column_stack([_per_usd(self.gbp_usd, p.currency) for p in self.positions]) \
+            if self.positions else np.empty((len(self.dates), 0))
+        self.base_per_local = self.base_per_usd[:, None] / local_per_usd
+
+        self.values = self.quantities * self.prices * self.base_per_usd[:, None]
+        # Unrealised P&L in each position's own currency, translated at each date's rate
+        self.pnl = (self.quantities * self.prices * local_per_usd - self.cost_basis) * self.base_per_local
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame, positions: List[Position],
+                   base_currency: str = "GBP") -> "PortfolioHistory":
+        """Build from a history frame with raw price columns or their _close aggregates"""
+        fields = [ASSET_PRICES[position.asset] for position in positions] + ["gbp_usd"]
+        columns = {}
+        for field in dict.fromkeys(fields):
+            column = field if field in frame else f"{field}_close"
+            columns[field] = frame[column] if column in frame else pd.Series(np.nan, index=frame.index)
+        prices = pd.DataFrame(columns, index=frame.index).astype(np.float64)
+
+        # One row per calendar day (its last observation), with gaps filled from earlier days
+        daily = prices.groupby(prices.index.normalize()).last().ffill()
+        daily = daily[daily.notna().all(axis=1)]
+        matrix = daily[fields[:-1]].to_numpy() if positions else np.empty((len(daily), 0))
+        return cls(daily.index, matrix, daily["gbp_usd"].to_numpy(), positions, base_currency)
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def nav(self) -> pd.Series:
+        """Total value of all positions on each date"""
+        return pd.Series(self.values.sum(axis=1), index=self.dates, name="nav")
+
+    def total_pnl(self) -> pd.Series:
+        """Unrealised P&L of all positions against their cost basis on each date"""
+        return pd.Series(self.pnl.sum(axis=1), index=self.dates, name="pnl")
+
+    def drawdown(self) -> pd.Series:
+        """Fall of NAV from its running peak, as a fraction (0 at a new high)"""
+        nav = self.values.sum(axis=1)
+        peak = np.maximum.accumulate(nav) if len(nav) else nav
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = np.where(peak > 0, nav / peak - 1.0, 0.0)
+        return pd.Series(drawdown, index=self.dates, name="drawdown")
+
+    def attribution(self) -> pd.DataFrame:
+        """Change in each position's value over the history, split into price and currency effects.
+
+        The daily change quantity * (price * rate) is split exactly into
+        quantity * change in USD price * previous rate (price) and
+        quantity * price * change in rate (currency), where rate converts
+        USD into the base currency, then summed over all days.
+        """
+        price_effect = np.zeros(len(self.positions))
+        currency_effect = np.zeros(len(self.positions))
+        if len(self) > 1:
+            rate = self.base_per_usd[:, None]
+            price_effect = (self.quantities * np.diff(self.prices, axis=0) * rate[:-1]).sum(axis=0)
+            currency_effect = (self.quantities * self.prices[1:] * np.diff(rate, axis=0)).sum(axis=0)
+        return pd.DataFrame({
+            "price": price_effect,
+            "currency": currency_effect,
+            "total": price_effect + currency_effect
+        }, index=pd.Index(self.names, name="position"))
+
+    def latest(self) -> Optional[pd.DataFrame]:
+        """Value, cost and unrealised P&L of each position on the most recent date, in the base currency"""
+        if not len(self):
+            return None
+        cost = self.cost_basis * self.base_per_local[-1]
+        return pd.DataFrame({
+            "quantity": self.quantities,
+            "value": self.values[-1],
+            "cost": cost,
+            "pnl": self.pnl[-1],
+            "return": np.where(cost != 0, self.pnl[-1] / np.where(cost != 0, cost, 1.0), np.nan)
+        }, index=pd.Index(self.names, name="position"))
@@ -0,0 +1,183 @@
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Provider:
+    name: str
+    fetch: Callable[[], Dict[str, Optional[float]]]
+    fields: List[str]
+
+class ProviderHealth:
+    """Rolling latency and error rate of one provider, with a circuit breaker.
+
+    After failure_threshold consecutive failures the circuit opens and the
+    provider is skipped for reset_timeout seconds. It then goes half-open:
+    one call is let through as a probe, which either closes the circuit or
+    opens it again.
+    """
+
+    def __init__(self, window: int = 20, failure_threshold: int = 3, reset_timeout: float = 60.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.samples: deque = deque(maxlen=window)  # (seconds, ok)
+        self.consecutive_failures = 0
+        self.last_failure: Optional[float] = None
+        self.opened_at: Optional[float] = None
+        self.probing = False
+
+    @property
+    def latency(self) -> float:
+        return sum(seconds for seconds, _ in self.samples) / len(self.samples) if self.samples else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        return sum(1 for _, ok in self.samples if not ok) / len(self.samples) if self.samples else 0.0
+
+    def state(self, now: float) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "open" if now - self.opened_at < self.reset_timeout else "half-open"
+
+    def acquire(self, now: float) -> bool:
+        """Whether a call may go ahead; claims the probe slot when half-open"""
+        state = self.state(now)
+        if state == "closed":
+            return True
+        if state == "half-open" and not self.probing:
+            self.probing = True
+            return True
+        return False
+
+    def record(self, seconds: float, ok: bool, now: float):
+        self.samples.append((seconds, ok))
+        self.probing = False
+        if ok:
+            self.consecutive_failures = 0
+            self.opened_at = None
+            return
+        self.consecutive_failures += 1
+        self.last_failure = now
+        if self.opened_at is not None or self.consecutive_failures >= self.failure_threshold:
+            self.opened_at = now
+
+    def degraded(self, now: float, max_error_rate: float) -> bool:
+        """Failing often and recently; cleared reset_timeout after the last failure so the provider is retried"""
+        return (self.error_rate > max_error_rate and self.last_failure is not None
+                and now - self.last_failure < self.reset_timeout)
+
+    def stats(self, now: float) -> Dict[str, Any]:
+        return {
+            "state": self.state(now),
+            "latency": round(self.latency, 3),
+            "error_rate": round(self.error_rate, 3),
+            "calls": len(self.samples)
+        }
+
+class ProviderRegistry:
+    """Routes each field to the healthiest of its providers.
+
+    Fields map to providers in registration order, which is the preference
+    order. Providers whose circuit is open are skipped. Any whose rolling
+    error rate exceeds max_error_rate, and that failed within the last
+    reset_timeout seconds, go behind the healthy ones in order of error
+    rate and then latency. If a provider fails or returns nothing for a
+    field, the next provider for that field is tried.
+    """
+
+    def __init__(self, window: int = 20, failure_threshold: int = 3, reset_timeout: float = 60.0,
+                 max_error_rate: float = 0.5):
+        self.window = window
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_error_rate = max_error_rate
+        self.providers: Dict[str, Provider] = {}
+        self.health: Dict[str, ProviderHealth] = {}
+        self.routes: Dict[str, List[str]] = {}
+        self._lock = Lock()
+
+    def register(self, provider: Provider):
+        self.providers[provider.name] = provider
+        self.health[provider.name] = ProviderHealth(self.window, self.failure_threshold, self.reset_timeout)
+        for field in provider.fields:
+            self.routes.setdefault(field, []).append(provider.name)
+
+    def ranked(self, field: str) -> List[str]:
+        """Providers for field, best first"""
+        names = self.routes.get(field, [])
+        now = time.time()
+        with self._lock:
+            def key(item):
+                position, name = item
+                health = self.health[name]
+                degraded = health.degraded(now, self.max_error_rate)
+                return (degraded, health.error_rate if degraded else 0.0,
+                        health.latency if degraded else 0.0, position)
+            return [name for _, name in sorted(enumerate(names), key=key)]
+
+    def _call(self, name: str, fields: List[str]) -> Optional[Dict[str, Optional[float]]]:
+        health = self.health[name]
+        with self._lock:
+            if not health.acquire(time.time()):
+                logger.info(f"Skipping {name}: circuit open")
+                get_metrics().inc("provider_skipped_total", provider=name)
+                return None
+
+        started = time.monotonic()
+        try:
+            values = self.providers[name].fetch()
+            ok = any(values.get(field) is not None for field in fields)
+        except Exception as e:
+            logger.error(f"Provider {name} failed: {str(e)}")
+            values, ok = None, False
+
+        elapsed = time.monotonic() - started
+        get_metrics().observe("provider_fetch_seconds", elapsed, provider=name)
+        if not ok:
+            get_metrics().inc("provider_errors_total", provider=name)
+        with self._lock:
+            health.record(elapsed, ok, time.time())
+            if not ok and health.opened_at is not None:
+                logger.warning(f"Circuit open for {name} after {health.consecutive_failures} failures")
+        return values if ok else None
+
+    def fetch(self, fields: List[str]) -> Tuple[Dict[str, Optional[float]], Dict[str, str]]:
+        """Values for fields and the provider each one came from"""
+        values: Dict[str, Optional[float]] = {field: None for field in fields}
+        sources: Dict[str, str] = {}
+        tried = set()
+        remaining = list(fields)
+
+        while remaining:
+            # Ask the best untried provider of each remaining field, one provider call per round
+            candidates = {field: next((name for name in self.ranked(field) if name not in tried), None)
+                          for field in remaining}
+            name = next((candidate for candidate in candidates.values() if candidate is not None), None)
+            if name is None:
+                break
+            tried.add(name)
+
+            wanted = [field for field, candidate in candidates.items() if candidate == name]
+            result = self._call(name, wanted)
+            if result:
+                for field in wanted:
+                    if result.get(field) is not None:
+                        values[field] = result[field]
+                        sources[field] = name
+            remaining = [field for field in remaining if field not in sources]
+
+        if remaining:
+            logger.warning(f"No provider returned {remaining}")
+        return values, sources
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            return {name: health.stats(now) for name, health in self.health.items()}
@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import time
+from threading import Lock
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlparse
+
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+YAHOO_HOST = "query2.finance.yahoo.com"
+FRED_HOST = "api.stlouisfed.org"
+
+# Host -> (sustained requests per second, burst capacity)
+DEFAULT_HOST_BUDGETS = {
+    YAHOO_HOST: (2.0, 4),
+    FRED_HOST: (2.0, 10),  # FRED allows 120 requests a minute per key
+    "nwp-prototype.ons.gov.uk": (1.0, 2),
+    "www.bankofengland.co.uk": (1.0, 2)
+}
+DEFAULT_BUDGET = (5.0, 10)
+
+def host_for(url: str) -> str:
+    return urlparse(url).hostname or url
+
+class TokenBucket:
+    """Token bucket allowing bursts of capacity calls and rate calls per second sustained.
+
+    Callers reserve their token under the lock, going into debt when the
+    bucket is empty, and then sleep off the debt outside the lock. Waiters
+    are therefore served in arrival order and never block callers of
+    other buckets.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = Lock()
+        self.calls = 0
+        self.waits = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """Take tokens and return how many seconds the caller must wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= tokens
+            wait = max(0.0, -self._tokens / self.rate)
+
+            self.calls += 1
+            if wait > 0:
+                self.waits += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+            return wait
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "rate": self.rate,
+                "capacity": self.capacity,
+                "calls": self.calls,
+                "waits": self.waits,
+                "total_wait": round(self.total_wait, 3),
+                "max_wait": round(self.max_wait, 3)
+            }
+
+class HostRateLimiter:
+    """One token bucket per upstream host, so each host's budget is independent"""
+
+    def __init__(self, budgets: Optional[Dict[str, Tuple[float, float]]] = None,
+                 default: Tuple[float, float] = DEFAULT_BUDGET):
+        self.budgets = {**DEFAULT_HOST_BUDGETS, **(budgets or {})}
+        self.default = default
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._lock = Lock()
+
+    def bucket(self, host: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                bucket = self._buckets[host] = TokenBucket(*self.budgets.get(host, self.default))
+            return bucket
+
+    def acquire(self, host: str, tokens: float = 1.0) -> float:
+        """Block until host's budget allows a call; returns the seconds waited"""
+        wait = self.bucket(host).acquire(tokens)
+        get_metrics().observe("rate_limit_wait_seconds", wait, host=host)
+        if wait > 0:
+            logger.info(f"Rate limited: waited {wait:.2f}s for {host}")
+        return wait
+
+    async def acquire_async(self, host: str, tokens: float = 1.0) -> float:
+        wait = await self.bucket(host).acquire_async(tokens)
+        get_metrics().observe("rate_limit_wait_seconds", wait, host=host)
+        if wait > 0:
+            logger.info(f"Rate limited: waited {wait:.2f}s for {host}")
+        return wait
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            buckets = dict(self._buckets)
+        return {host: bucket.stats() for host, bucket in buckets.items()}
+
+_limiter: Optional[HostRateLimiter] = None
+_limiter_lock = Lock()
+
+def get_rate_limiter() -> HostRateLimiter:
+    """Return the process-wide limiter, shared by every fetcher"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = HostRateLimiter()
+        return _limiter
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import os
+import re
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+from bs4 import BeautifulSoup, SoupStrainer
+
+from metrics import get_metrics
+from rate_limit import get_rate_limiter, host_for
+
+logger = logging.getLogger(__name__)
+
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except ImportError:
+    HTML_PARSER = "html.parser"
+
+ONS_INFLATION_URL = "https://nwp-prototype.ons.gov.uk/economy/inflation-and-price-indices/"
+BOE_BANK_RATE_URL = "https://www.bankofengland.co.uk/boeapps/database/Bank-Rate.asp"
+
+BROWSER_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+BOE_COOKIES = {
+    'cookie_consent': 'accepted',
+    'cookie_consent_essential': 'accepted',
+    'cookie_consent_analytics': 'accepted'
+}
+
+# Plausible ranges; anything outside is treated as a parsing failure
+INFLATION_RANGE = (-10.0, 30.0)
+BANK_RATE_RANGE = (0.0, 20.0)
+
+# CPI (not CPIH) annual rate, e.g. "The Consumer Prices Index (CPI) rose by 2.6% in the 12 months..."
+CPI_PATTERNS = [
+    re.compile(r"\bCPI\b\)?[^.%]{0,80}?\b(rose|fell|increased|decreased|was|stood at)\s+(?:by\s+)?(-?\d+(?:\.\d+)?)\s*%",
+               re.IGNORECASE),
+    re.compile(r"\bCPI\b[^.%]{0,80}?\bannual (?:inflation )?rate[^.%]{0,40}?(-?\d+(?:\.\d+)?)\s*%", re.IGNORECASE)
+]
+BANK_RATE_PATTERN = re.compile(r"Current Bank Rate\s*(?:<[^>]+>\s*)*(\d+(?:\.\d+)?)\s*%", re.IGNORECASE)
+
+@dataclass
+class Page:
+    url: str
+    text: str
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    changed: bool = True  # False when the server answered 304 Not Modified
+
+class ConditionalFetcher:
+    """GETs over one persistent session that revalidate with ETag and Last-Modified.
+
+    The body and validators of each page are kept on disk, so after the
+    first download (even across restarts) an unchanged page costs a single
+    304 response.
+    """
+
+    def __init__(self, cache_dir: str = ".scrape_cache", timeout: float = 10.0):
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(BROWSER_HEADERS)
+        self._pages: Dict[str, Page] = {}
+        self._lock = Lock()
+
+    def _cache_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, f"{hashlib.sha1(url.encode()).hexdigest()}.json")
+
+    def _load(self, url: str) -> Optional[Page]:
+        page = self._pages.get(url)
+        if page is not None:
+            return page
+        try:
+            with open(self._cache_path(url)) as f:
+                cached = json.load(f)
+            return Page(url, cached["text"], cached.get("etag"), cached.get("last_modified"))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, page: Page):
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = f"{self._cache_path(page.url)}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"text": page.text, "etag": page.etag, "last_modified": page.last_modified}, f)
+            os.replace(tmp_path, self._cache_path(page.url))
+        except Exception as e:
+            logger.error(f"Could not cache {page.url}: {str(e)}")
+
+    def get(self, url: str, cookies: Optional[Dict[str, str]] = None) -> Page:
+        with self._lock:
+            cached = self._load(url)
+
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+
+        host = host_for(url)
+        get_rate_limiter().acquire(host)
+        with get_metrics().span("upstream_request", host=host):
+            response = self.session.get(url, headers=headers, cookies=cookies, timeout=self.timeout)
+        if response.status_code == 304 and cached is not None:
+            page = Page(url, cached.text, cached.etag, cached.last_modified, changed=False)
+            logger.info(f"{url} not modified")
+        else:
+            response.raise_for_status()
+            page = Page(url, response.text, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+            if page.etag or page.last_modified:
+                self._save(page)
+
+        get_metrics().inc("scrape_pages_total", host=host, result="changed" if page.changed else "not_modified")
+        with self._lock:
+            self._pages[url] = page
+        return page
+
+def _in_range(value: float, bounds: Tuple[float, float]) -> bool:
+    return bounds[0] <= value <= bounds[1]
+
+def extract_cpi_rate(text: str) -> Optional[float]:
+    """CPI annual inflation rate from a sentence of ONS commentary, or None if it isn't there"""
+    text = " ".join(text.split())
+    for pattern in CPI_PATTERNS:
+        for match in pattern.finditer(text):
+            value = float(match.group(match.lastindex))
+            verb = match.group(1).lower() if match.lastindex > 1 else ""
+            if verb in ("fell", "decreased") and value > 0:
+                value = -value
+            if _in_range(value, INFLATION_RANGE):
+                return value
+    return None
+
+def parse_ons_inflation(html: str) -> Optional[float]:
+    """UK CPI inflation from the ONS inflation page.
+
+    Reads the featured chart description first, then falls back to any
+    paragraph on the page that reports the CPI rate.
+    """
+    featured = BeautifulSoup(html, HTML_PARSER,
+                             parse_only=SoupStrainer("div", class_="featured-chart__item-description"))
+    for div in featured.find_all("div"):
+        value = extract_cpi_rate(div.get_text(" "))
+        if value is not None:
+            return value
+
+    logger.warning("CPI not found in the ONS featured chart description, searching the page")
+    paragraphs = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer(["p", "li"]))
+    for element in paragraphs.find_all(["p", "li"]):
+        value = extract_cpi_rate(element.get_text(" "))
+        if value is not None:
+            return value
+    return None
+
+def parse_boe_rate_rows(html: str) -> List[List[str]]:
+    """Rows of [date changed, rate] from the Bank Rate table, newest first, validated"""
+    tables = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer("table"))
+    table = tables.find("table")
+    if not table:
+        return []
+
+    rows = []
+    for row in table.find_all("tr"):
+        cells = [cell.get_text(strip=True) for cell in row.find_all("td")]
+        if len(cells) < 2:
+            continue  # Header or layout row
+        try:
+            datetime.strptime(cells[0], "%d %b %y")
+            rate = float(cells[1].replace('%', ''))
+        except ValueError:
+            logger.warning(f"Skipping unrecognised Bank Rate row: {cells}")
+            continue
+        if _in_range(rate, BANK_RATE_RANGE):
+            rows.append(cells)
+    return rows
+
+def parse_boe_bank_rate(html: str) -> Optional[float]:
+    """Current Bank Rate: the newest table row, or the page's "Current Bank Rate" banner"""
+    rows = parse_boe_rate_rows(html)
+    if rows:
+        return float(rows[0][1].replace('%', ''))
+
+    logger.warning("Bank Rate table not found, falling back to the Current Bank Rate banner")
+    match = BANK_RATE_PATTERN.search(html)
+    if match and _in_range(float(match.group(1)), BANK_RATE_RANGE):
+        return float(match.group(1))
+    return None
+
+class UKRatesScraper:
+    """ONS and Bank of England scrapers that only re-parse pages when they change"""
+
+    def __init__(self, fetcher: Optional[ConditionalFetcher] = None):
+        self.fetcher = fetcher or ConditionalFetcher()
+        self._parsed: Dict[Tuple[str, str], Any] = {}
+
+    def _parse(self, page: Page, name: str, parser: Callable[[str], Any]) -> Any:
+        key = (page.url, name)
+        if page.changed or key not in self._parsed:
+            self._parsed[key] = parser(page.text)
+        return self._parsed[key]
+
+    def get_inflation(self) -> Optional[float]:
+        page = self.fetcher.get(ONS_INFLATION_URL)
+        value = self._parse(page, "inflation", parse_ons_inflation)
+        if value is None:
+            logger.error("Could not extract UK CPI inflation from the ONS page")
+        return value
+
+    def get_bank_rate_rows(self) -> List[List[str]]:
+        page = self.fetcher.get(BOE_BANK_RATE_URL, cookies=BOE_COOKIES)
+        return self._parse(page, "rows", parse_boe_rate_rows)
+
+    def get_bank_rate(self) -> Optional[float]:
+        page = self.fetcher.get(BOE_BANK_RATE_URL, cookies=BOE_COOKIES)
+        value = self._parse(page, "rate", parse_boe_bank_rate)
+        if value is None:
+            logger.error("Could not extract Bank Rate from the Bank of England page")
+        return value
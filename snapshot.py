@@ -0,0 +1,107 @@
+import logging
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Snapshot:
+    data: Dict[str, Any]
+    fetched_at: float = field(default_factory=time.time)
+    duration: float = 0.0
+
+    @property
+    def age(self) -> float:
+        """Seconds since this snapshot was produced"""
+        return max(0.0, time.time() - self.fetched_at)
+
+class SnapshotProvider:
+    """Process-wide holder of the latest market snapshot.
+
+    A single background thread calls the loader every refresh_interval
+    seconds. Readers get the latest snapshot without any network I/O, and
+    callers that ask for a refresh while one is already running wait on
+    that refresh instead of starting another. Listeners are called with
+    each new snapshot.
+    """
+
+    def __init__(self, loader: Callable[[], Dict[str, Any]], refresh_interval: float = 60.0):
+        self.loader = loader
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = Lock()
+        self._inflight: Optional[Future] = None
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+        self.listeners: List[Callable[[Snapshot], None]] = []
+
+    def start(self):
+        """Start the background refresher if it isn't already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name="snapshot-refresher", daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+            except Exception as e:
+                logger.error(f"Snapshot refresh failed: {str(e)}")
+            self._stop.wait(self.refresh_interval)
+
+    def get(self, wait: bool = True, timeout: Optional[float] = None) -> Optional[Snapshot]:
+        """Return the latest snapshot.
+
+        Before the first refresh has completed this joins the in-flight
+        refresh when wait is True, otherwise it returns None.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None or not wait:
+            return snapshot
+        try:
+            return self.refresh(timeout=timeout)
+        except Exception as e:
+            logger.error(f"Initial snapshot refresh failed: {str(e)}")
+            return self._snapshot
+
+    def refresh(self, timeout: Optional[float] = None) -> Snapshot:
+        """Produce a new snapshot, coalescing concurrent callers onto one loader call"""
+        with self._lock:
+            future = self._inflight
+            owner = future is None
+            if owner:
+                future = self._inflight = Future()
+
+        if not owner:
+            return future.result(timeout=timeout)
+
+        started = time.monotonic()
+        try:
+            data = self.loader()
+            snapshot = Snapshot(data=data, duration=time.monotonic() - started)
+            self._snapshot = snapshot
+            future.set_result(snapshot)
+            logger.info(f"Snapshot refreshed in {snapshot.duration:.2f}s")
+            for listener in self.listeners:
+                try:
+                    listener(snapshot)
+                except Exception as e:
+                    logger.error(f"Snapshot listener failed: {str(e)}")
+            return snapshot
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight = None
@@ -0,0 +1,15 @@
+# Treasury yield fields and spreads, free of numpy and pandas so lightweight modules can import them
+
+# Yield fields and their maturities in years, shortest first
+TENORS = {
+    "us_2y_yield": 2.0,
+    "us_5y_yield": 5.0,
+    "us_10y_yield": 10.0,
+    "us_30y_yield": 30.0
+}
+
+# Spread name -> (long tenor field, short tenor field)
+SPREADS = {
+    "2s10s": ("us_10y_yield", "us_2y_yield"),
+    "5s30s": ("us_30y_yield", "us_5y_yield")
+}
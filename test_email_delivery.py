@@ -0,0 +1,138 @@
+import email
+import logging
+import socketserver
+import threading
+
+from email_delivery import EmailDispatcher
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+class LocalSMTPServer(socketserver.ThreadingTCPServer):
+    """Minimal plain SMTP server on a free local port that records what it receives.
+
+    fail_data makes that many DATA commands fail with a 421 and a dropped
+    connection, the way a server shutting down mid-session would.
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), SMTPHandler)
+        self.messages = []
+        self.connections = 0
+        self.fail_data = 0
+        self.lock = threading.Lock()
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(f"{line}\r\n".encode())
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections += 1
+        self.reply("220 localhost ESMTP test server")
+        for raw in self.rfile:
+            command = raw.decode().strip().upper()
+            if command.startswith(("EHLO", "HELO")):
+                self.reply("250 localhost")
+            elif command.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif command == "DATA":
+                with self.server.lock:
+                    failing = self.server.fail_data > 0
+                    self.server.fail_data -= failing
+                if failing:
+                    self.reply("421 Service not available, closing transmission channel")
+                    return
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                lines = []
+                for data in self.rfile:
+                    if data in (b".\r\n", b".\n"):
+                        break
+                    lines.append(data[1:] if data.startswith(b"..") else data)
+                with self.server.lock:
+                    self.server.messages.append(email.message_from_bytes(b"".join(lines)))
+                self.reply("250 OK")
+            elif command == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Command not implemented")
+
+def start_server() -> LocalSMTPServer:
+    server = LocalSMTPServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def make_dispatcher(server: LocalSMTPServer, **options) -> EmailDispatcher:
+    options = {"coalesce_window": 0.3, "base_backoff": 0.05, **options}
+    return EmailDispatcher("127.0.0.1", server.port, "alerts@example.com", "me@example.com",
+                           use_starttls=False, **options)
+
+def test_digest():
+    server = start_server()
+    dispatcher = make_dispatcher(server)
+    try:
+        # Alerts from one tick arrive as a single digest message
+        for asset in ("Gold", "Bitcoin", "S&P 500"):
+            dispatcher.enqueue(f"Market Alert: {asset} moved by +2.00%", f"{asset} moved")
+        assert dispatcher.flush(timeout=10)
+        assert len(server.messages) == 1
+        assert server.messages[0]["Subject"] == "Market Alerts: 3 significant changes"
+        body = server.messages[0].get_payload()[0].get_payload()
+        assert all(asset in body for asset in ("Gold", "Bitcoin", "S&P 500"))
+    finally:
+        dispatcher.stop(timeout=10)
+        server.shutdown()
+
+def test_connection_reuse():
+    server = start_server()
+    dispatcher = make_dispatcher(server)
+    try:
+        # Separate ticks are separate messages over the same session
+        for day in range(3):
+            dispatcher.enqueue(f"Daily Market Summary {day}", "summary", digest=False)
+            assert dispatcher.flush(timeout=10)
+        assert [message["Subject"] for message in server.messages] == \
+            [f"Daily Market Summary {day}" for day in range(3)]
+        assert server.connections == 1
+        assert dispatcher.stats()["connections"] == 1
+    finally:
+        dispatcher.stop(timeout=10)
+        server.shutdown()
+
+def test_transient_failure_retried():
+    server = start_server()
+    server.fail_data = 1
+    dispatcher = make_dispatcher(server)
+    try:
+        dispatcher.enqueue("Market Alert: Gold moved by +1.50%", "Gold moved", digest=False)
+        assert dispatcher.flush(timeout=10)
+        assert len(server.messages) == 1
+        stats = dispatcher.stats()
+        assert (stats["sent"], stats["retries"], stats["failed"]) == (1, 1, 0)
+        # The dropped session was replaced with a new one
+        assert server.connections == 2
+    finally:
+        dispatcher.stop(timeout=10)
+        server.shutdown()
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_digest, test_connection_reuse, test_transient_failure_retried):
+        try:
+            test()
+            logger.info(f"{test.__name__} passed")
+        except Exception:
+            failures += 1
+            logger.error(f"{test.__name__} failed", exc_info=True)
+    raise SystemExit(1 if failures else 0)
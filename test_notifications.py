@@ -38,6 +38,12 @@ def test_notifications():
         logger.info("Testing daily summary...")
         notification_manager.send_daily_summary(current_data)
 
+        # Wait for the background sender before exiting
+        if not notification_manager.flush(timeout=120):
+            logger.error("Timed out waiting for queued emails")
+            return False
+        logger.info(f"Email delivery stats: {notification_manager.dispatcher.stats()}")
+
         logger.info("Notification test completed successfully")
         return True
 
@@ -0,0 +1,96 @@
+import logging
+import os
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from scrapers import (ConditionalFetcher, extract_cpi_rate, parse_boe_bank_rate,
+                      parse_boe_rate_rows, parse_ons_inflation)
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name)) as f:
+        return f.read()
+
+def test_ons_inflation():
+    assert parse_ons_inflation(read_fixture("ons_inflation.html")) == 3.8
+    # Without the featured description the page paragraphs are searched
+    assert parse_ons_inflation(read_fixture("ons_inflation_reworded.html")) == 3.8
+    assert parse_ons_inflation("<html><body><p>No figures today</p></body></html>") is None
+
+def test_cpi_wording():
+    assert extract_cpi_rate("The Consumer Prices Index (CPI) rose by 2.6% in the 12 months to March") == 2.6
+    assert extract_cpi_rate("The Consumer Prices Index (CPI) fell by 0.1% in the 12 months to April") == -0.1
+    assert extract_cpi_rate("CPIH rose by 4.1% in the 12 months to August") is None
+    # Implausible figures are rejected rather than stored
+    assert extract_cpi_rate("CPI rose by 250% in the 12 months to August") is None
+
+def test_boe_bank_rate():
+    html = read_fixture("boe_bank_rate.html")
+    rows = parse_boe_rate_rows(html)
+    assert rows[0] == ["07 Aug 25", "4.00"]
+    assert len(rows) == 6
+    assert parse_boe_bank_rate(html) == 4.0
+    # Falls back to the Current Bank Rate banner when the table is missing
+    assert parse_boe_bank_rate(read_fixture("boe_bank_rate_no_table.html")) == 4.0
+
+def test_conditional_get():
+    body = read_fixture("boe_bank_rate.html").encode()
+    etag = '"bank-rate-v1"'
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.end_headers()
+                statuses.append(304)
+                return
+            self.send_response(200)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Type", "text/html")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            statuses.append(200)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/Bank-Rate.asp"
+    try:
+        with tempfile.TemporaryDirectory() as cache_dir:
+            fetcher = ConditionalFetcher(cache_dir=cache_dir)
+            first = fetcher.get(url)
+            second = fetcher.get(url)
+            assert first.changed and not second.changed
+            assert second.text == first.text
+
+            # Validators survive a restart
+            restarted = ConditionalFetcher(cache_dir=cache_dir).get(url)
+            assert not restarted.changed and parse_boe_bank_rate(restarted.text) == 4.0
+        assert statuses == [200, 304, 304]
+    finally:
+        server.shutdown()
+
+if __name__ == "__main__":
+    failures = 0
+    for test in (test_ons_inflation, test_cpi_wording, test_boe_bank_rate, test_conditional_get):
+        try:
+            test()
+            logger.info(f"{test.__name__} passed")
+        except Exception:
+            failures += 1
+            logger.error(f"{test.__name__} failed", exc_info=True)
+    raise SystemExit(1 if failures else 0)
@@ -1,8 +1,8 @@
 import os
 import logging
 import sys
-import psycopg2
 from psycopg2.extras import RealDictCursor
+from db import get_pool
 
 # Configure logging
 logging.basicConfig(
@@ -17,19 +17,20 @@ logger = logging.getLogger(__name__)
 
 def test_database_connection():
     try:
-        # Get database URL from environment
-        database_url = os.environ.get('DATABASE_URL')
-
         logger.info("Attempting to connect to database...")
-        logger.info(f"Database URL available: {'Yes' if database_url else 'No'}")
+        logger.info(f"Database URL available: {'Yes' if os.environ.get('DATABASE_URL') else 'No'}")
 
-        # Connect to the database
-        conn = psycopg2.connect(database_url)
-        cur = conn.cursor(cursor_factory=RealDictCursor)
+        pool = get_pool()
+        if not pool:
+            return False
 
         # Try a simple query
-        cur.execute("SELECT * FROM financial_data LIMIT 1;")
-        result = cur.fetchall()
+        with pool.connection() as conn:
+            with conn.cursor(cursor_factory=RealDictCursor) as cur:
+                cur.execute("SELECT * FROM financial_data LIMIT 1;")
+                result = cur.fetchall()
+
+        logger.info(f"Database pool stats: {pool.stats()}")
 
         if result:
             logger.info("Successfully connected to database and retrieved data")
@@ -43,11 +44,6 @@ def test_database_connection():
         logger.error(f"Failed to connect to database: {str(e)}")
         logger.error("Full traceback:", exc_info=True)
         return False
-    finally:
-        if 'cur' in locals():
-            cur.close()
-        if 'conn' in locals():
-            conn.close()
 
 if __name__ == "__main__":
     test_database_connection()
\ No newline at end of file
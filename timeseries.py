@@ -0,0 +1,138 @@
+import io
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from psycopg2 import sql
+
+from db import get_pool, FINANCIAL_DATA_COLUMNS
+from metrics import get_metrics
+
+logger = logging.getLogger(__name__)
+
+# Resolution name -> date_trunc unit; raw returns stored rows unaggregated
+RESOLUTIONS = {
+    "raw": None,
+    "hourly": "hour",
+    "daily": "day",
+    "weekly": "week",
+    "monthly": "month"
+}
+
+SERIES_FIELDS = FINANCIAL_DATA_COLUMNS[1:]
+
+def _validate_fields(fields: List[str]) -> List[str]:
+    unknown = [field for field in fields if field not in SERIES_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown financial_data fields: {unknown}")
+    return list(fields)
+
+def _raw_query(fields: List[str]) -> sql.Composed:
+    columns = [sql.SQL("{}::float8 AS {}").format(sql.Identifier(f), sql.Identifier(f)) for f in fields]
+    return sql.SQL("""
+        SELECT timestamp, {columns}
+        FROM financial_data
+        WHERE timestamp >= %(start)s AND timestamp < %(end)s
+        ORDER BY timestamp
+    """).format(columns=sql.SQL(", ").join(columns))
+
+def _ohlc_query(fields: List[str], unit: str) -> sql.Composed:
+    columns = []
+    for f in fields:
+        col = sql.Identifier(f)
+        columns.extend([
+            sql.SQL("((array_agg({c} ORDER BY timestamp) FILTER (WHERE {c} IS NOT NULL))[1])::float8 AS {a}")
+                .format(c=col, a=sql.Identifier(f"{f}_open")),
+            sql.SQL("max({c})::float8 AS {a}").format(c=col, a=sql.Identifier(f"{f}_high")),
+            sql.SQL("min({c})::float8 AS {a}").format(c=col, a=sql.Identifier(f"{f}_low")),
+            sql.SQL("((array_agg({c} ORDER BY timestamp DESC) FILTER (WHERE {c} IS NOT NULL))[1])::float8 AS {a}")
+                .format(c=col, a=sql.Identifier(f"{f}_close"))
+        ])
+    return sql.SQL("""
+        SELECT date_trunc({unit}, timestamp) AS timestamp, {columns}
+        FROM financial_data
+        WHERE timestamp >= %(start)s AND timestamp < %(end)s
+        GROUP BY 1
+        ORDER BY 1
+    """).format(unit=sql.Literal(unit), columns=sql.SQL(", ").join(columns))
+
+def _copy_to_frame(pool, query: sql.Composed, params: dict) -> pd.DataFrame:
+    """Stream a query out of Postgres as CSV and parse it in one vectorised pass"""
+    buffer = io.StringIO()
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            bound = cur.mogrify(query.as_string(conn), params).decode()
+            cur.copy_expert(f"COPY ({bound}) TO STDOUT WITH CSV HEADER", buffer)
+    buffer.seek(0)
+    frame = pd.read_csv(buffer)
+    frame["timestamp"] = pd.to_datetime(frame["timestamp"], utc=True)
+    return frame.set_index("timestamp")
+
+def read_series(fields: List[str], start: Optional[datetime] = None, end: Optional[datetime] = None,
+                resolution: str = "raw", pool=None) -> Optional[pd.DataFrame]:
+    """Read a time series of financial_data fields as a float frame indexed by timestamp.
+
+    resolution is one of RESOLUTIONS. Aggregated resolutions return
+    <field>_open, <field>_high, <field>_low and <field>_close columns per
+    bucket, computed in SQL so only one row per bucket leaves the database.
+    Returns None if the database is unavailable.
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution {resolution!r}, expected one of {list(RESOLUTIONS)}")
+    fields = _validate_fields(fields)
+
+    pool = pool or get_pool()
+    if not pool:
+        logger.error("Cannot read time series: Database connection failed")
+        return None
+
+    unit = RESOLUTIONS[resolution]
+    query = _raw_query(fields) if unit is None else _ohlc_query(fields, unit)
+    params = {
+        "start": start or datetime(1970, 1, 1),
+        "end": end or datetime(9999, 1, 1)
+    }
+    with get_metrics().span("db_query", statement=f"read_series_{resolution}"):
+        frame = _copy_to_frame(pool, query, params)
+    logger.info(f"Read {len(frame)} {resolution} rows for {fields}")
+    return frame
+
+def read_latest(limit: int = 2, fields: Optional[List[str]] = None, pool=None) -> Optional[pd.DataFrame]:
+    """Read the most recent rows of financial_data, newest first"""
+    fields = _validate_fields(fields or SERIES_FIELDS)
+
+    pool = pool or get_pool()
+    if not pool:
+        logger.error("Cannot read latest rows: Database connection failed")
+        return None
+
+    columns = [sql.SQL("{}::float8 AS {}").format(sql.Identifier(f), sql.Identifier(f)) for f in fields]
+    query = sql.SQL("""
+        SELECT timestamp, {columns}
+        FROM financial_data
+        ORDER BY timestamp DESC
+        LIMIT %(limit)s
+    """).format(columns=sql.SQL(", ").join(columns))
+    with get_metrics().span("db_query", statement="read_latest"):
+        return _copy_to_frame(pool, query, {"limit": limit})
+
+MONTH_SUMMARY_SQL = """
+    SELECT to_char(timestamp AT TIME ZONE 'UTC', 'YYYY-MM') AS month, count(*), max(timestamp)
+    FROM financial_data
+    GROUP BY 1
+"""
+
+def read_month_summary(pool=None) -> Optional[Dict[str, Dict[str, Any]]]:
+    """Row count and latest timestamp of financial_data per UTC month, keyed by YYYY-MM"""
+    pool = pool or get_pool()
+    if not pool:
+        logger.error("Cannot read month summary: Database connection failed")
+        return None
+
+    with pool.connection() as conn:
+        with conn.cursor() as cur:
+            pool.execute(cur, "month_summary", MONTH_SUMMARY_SQL)
+            rows = cur.fetchall()
+    return {month: {"rows": count, "last": pd.Timestamp(last).tz_convert("UTC").isoformat()}
+            for month, count, last in rows}
@@ -0,0 +1,119 @@
+import logging
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from tenors import SPREADS, TENORS
+
+logger = logging.getLogger(__name__)
+
+class YieldCurveHistory:
+    """Full history of the Treasury curve as a dates x tenors matrix.
+
+    Missing yields are held as NaN and never treated as zero. All analytics
+    operate on the whole matrix at once rather than looping over dates.
+    """
+
+    def __init__(self, dates: pd.DatetimeIndex, yields: np.ndarray):
+        self.dates = pd.DatetimeIndex(dates)
+        self.yields = np.asarray(yields, dtype=np.float64)
+        self.fields = list(TENORS)
+        self.tenors = np.array(list(TENORS.values()))
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "YieldCurveHistory":
+        """Build from a history frame with raw yield columns or their _close aggregates"""
+        columns = []
+        for field in TENORS:
+            column = field if field in frame else f"{field}_close"
+            columns.append(frame[column] if column in frame else pd.Series(np.nan, index=frame.index))
+        matrix = np.column_stack([c.to_numpy(dtype=np.float64) for c in columns]) if len(frame) \
+            else np.empty((0, len(TENORS)))
+        # Rows with no yields at all carry no curve information
+        keep = ~np.isnan(matrix).all(axis=1)
+        return cls(frame.index[keep], matrix[keep])
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def spread(self, name: str) -> np.ndarray:
+        """Spread in percentage points for every date; NaN where either leg is missing"""
+        long_field, short_field = SPREADS[name]
+        return (self.yields[:, self.fields.index(long_field)]
+                - self.yields[:, self.fields.index(short_field)])
+
+    def spreads(self) -> pd.DataFrame:
+        return pd.DataFrame({name: self.spread(name) for name in SPREADS}, index=self.dates)
+
+    def inversion_periods(self, name: str = "2s10s") -> pd.DataFrame:
+        """Contiguous periods where the spread was negative.
+
+        A date with a missing spread continues whatever state preceded it,
+        so a data gap doesn't split one inversion into two.
+        """
+        spread = self.spread(name)
+        valid = ~np.isnan(spread)
+        # Carry the last valid observation's state across gaps
+        last_valid = np.maximum.accumulate(np.where(valid, np.arange(len(spread)), -1))
+        inverted = np.where(last_valid >= 0, spread[np.maximum(last_valid, 0)] < 0, False)
+
+        edges = np.diff(np.concatenate(([0], inverted.astype(np.int8), [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1) - 1
+        if len(starts) == 0:
+            return pd.DataFrame(columns=["start", "end", "observations", "min_spread"])
+
+        # Deepest point of each period, ignoring gaps
+        bounds = np.column_stack([starts, ends + 1]).ravel()
+        deepest = np.fmin.reduceat(np.append(spread, np.nan), bounds)[::2]
+        return pd.DataFrame({
+            "start": self.dates[starts],
+            "end": self.dates[ends],
+            "observations": ends - starts + 1,
+            "min_spread": deepest
+        })
+
+    def interpolate(self, maturities: Sequence[float]) -> np.ndarray:
+        """Linearly interpolate every curve onto the given maturities.
+
+        Returns a dates x maturities matrix. Missing tenors are bridged from
+        the nearest available tenors on either side; maturities outside the
+        observed tenors of a date are NaN rather than extrapolated.
+        """
+        maturities = np.asarray(maturities, dtype=np.float64)
+        n, k = self.yields.shape
+        valid = ~np.isnan(self.yields)
+        positions = np.arange(k)
+
+        # Nearest valid tenor at or below / at or above each tenor, per date
+        left = np.maximum.accumulate(np.where(valid, positions, -1), axis=1)
+        right = np.minimum.accumulate(np.where(valid, positions, k)[:, ::-1], axis=1)[:, ::-1]
+
+        # Tenor bracket for each target maturity
+        lower = np.clip(np.searchsorted(self.tenors, maturities, side="right") - 1, 0, k - 1)
+        upper = np.clip(lower + 1, 0, k - 1)
+        exact = np.isclose(self.tenors[lower], maturities)
+        upper = np.where(exact, lower, upper)
+
+        lo = left[:, lower]    # (n, m)
+        hi = right[:, upper]   # (n, m)
+        ok = (lo >= 0) & (hi < k)
+        lo_c, hi_c = np.clip(lo, 0, k - 1), np.clip(hi, 0, k - 1)
+
+        rows = np.arange(n)[:, None]
+        y_lo, y_hi = self.yields[rows, lo_c], self.yields[rows, hi_c]
+        t_lo, t_hi = self.tenors[lo_c], self.tenors[hi_c]
+        span = np.where(t_hi > t_lo, t_hi - t_lo, 1.0)
+        weight = np.where(t_hi > t_lo, (maturities - t_lo) / span, 0.0)
+        curves = y_lo + weight * (y_hi - y_lo)
+
+        # Maturities beyond the tenors observed on a date aren't extrapolated
+        in_range = (maturities >= self.tenors[0]) & (maturities <= self.tenors[-1])
+        return np.where(ok & in_range, curves, np.nan)
+
+    def latest_curve(self) -> Optional[Dict[str, float]]:
+        if not len(self):
+            return None
+        return {field: float(value) for field, value in zip(self.fields, self.yields[-1])
+                if not np.isnan(value)}